@@ -0,0 +1,350 @@
+# app/agents/calendar_sync.py
+# Two-way-ish Google Calendar sync for EventAgent output:
+#   pull: keep a local copy of the calendar current with incremental sync tokens
+#         (an unchanged calendar costs one small request)
+#   push: diff extracted events against that copy and send only new/changed
+#         ones, batched
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from app.agents.recurrence import FOREVER, rule_from_item
+from app.utils.cache import CACHE_DIR
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+TOKEN_PATH = os.getenv("GOOGLE_TOKEN", "token.json")
+CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS", "credentials.json")
+CALENDAR_ID = os.getenv("CALENDAR_ID", "primary")
+CALENDAR_TIMEZONE = os.getenv("CALENDAR_TIMEZONE", "")
+# Root URL of a fake Calendar server, e.g. http://127.0.0.1:9000/ (tests/offline runs)
+CALENDAR_API_ENDPOINT = os.getenv("CALENDAR_API_ENDPOINT", "")
+CALENDAR_CACHE_PATH = os.getenv("CALENDAR_CACHE", os.path.join(CACHE_DIR, "calendar.sqlite3"))
+# Google caps a Calendar batch at 50 calls
+CALENDAR_BATCH_SIZE = min(50, int(os.getenv("CALENDAR_BATCH_SIZE", "50")))
+
+FINGERPRINT_KEY = "geminidesk_fp"
+# Length given to events extracted without an end
+_DAY, _HOUR = timedelta(days=1), timedelta(hours=1)
+
+_creds = None
+_service = None
+_auth_lock = threading.Lock()
+
+
+def get_credentials():
+    """OAuth credentials, loaded (and refreshed/saved) once per process."""
+    global _creds
+    with _auth_lock:
+        if _creds is not None and _creds.valid:
+            return _creds
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+
+        creds = _creds
+        if creds is None and os.path.exists(TOKEN_PATH):
+            # Scopes come from the file: passing SCOPES here would make has_scopes() always true
+            creds = Credentials.from_authorized_user_file(TOKEN_PATH)
+            if not creds.has_scopes(SCOPES):
+                # e.g. the calendar.readonly token calendar_api_test.py writes; every insert would 403
+                print(f"[Calendar] {TOKEN_PATH} wasn't granted {' '.join(SCOPES)}, authorizing again")
+                creds = None
+        if creds is None and CALENDAR_API_ENDPOINT:
+            # A fake server doesn't check auth
+            from google.auth.credentials import AnonymousCredentials
+            _creds = AnonymousCredentials()
+            return _creds
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
+                creds = flow.run_local_server(port=8080)
+            with open(TOKEN_PATH, "w") as token:
+                token.write(creds.to_json())
+        _creds = creds
+        return _creds
+
+
+def get_service():
+    """The Calendar v3 client, built once (building parses the discovery document)."""
+    global _service
+    if _service is None:
+        from googleapiclient.discovery import build
+
+        options = {"api_endpoint": CALENDAR_API_ENDPOINT.rstrip("/") + "/calendar/v3/"} if CALENDAR_API_ENDPOINT else None
+        service = build("calendar", "v3", credentials=get_credentials(), client_options=options,
+                        cache_discovery=False)
+        with _auth_lock:
+            if _service is None:
+                _service = service
+    return _service
+
+
+def _new_batch(service, callback):
+    if CALENDAR_API_ENDPOINT:
+        # new_batch_http_request() would post to the real rootUrl from the discovery doc
+        from googleapiclient.http import BatchHttpRequest
+        return BatchHttpRequest(callback=callback, batch_uri=CALENDAR_API_ENDPOINT.rstrip("/") + "/batch/calendar/v3")
+    return service.new_batch_http_request(callback=callback)
+
+
+def _status(exc) -> int:
+    resp = getattr(exc, "resp", None)
+    return int(getattr(resp, "status", 0) or 0)
+
+
+# -- extracted event -> Calendar event ------------------------------------
+
+def _rrule(rule, all_day: bool) -> str:
+    if rule.unit == "days":
+        freq, interval = ("WEEKLY", rule.step // 7) if rule.step % 7 == 0 else ("DAILY", rule.step)
+    else:
+        freq, interval = ("YEARLY", rule.step // 12) if rule.step % 12 == 0 else ("MONTHLY", rule.step)
+    parts = [f"FREQ={freq}"]
+    if interval > 1:
+        parts.append(f"INTERVAL={interval}")
+    if rule.until != FOREVER:
+        # UNTIL has to be the same value type as DTSTART: a date for all-day events
+        if all_day:
+            parts.append("UNTIL=" + rule.until.strftime("%Y%m%d"))
+        else:
+            parts.append("UNTIL=" + rule.until.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ"))
+    return "RRULE:" + ";".join(parts)
+
+
+def _when(moment, all_day: bool, recurring: bool) -> dict:
+    if all_day:
+        return {"date": moment.date().isoformat()}
+    # Offset and zone name have to agree, or Google expands the RRULE in a
+    # different zone from the one the first occurrence was written in
+    zone = ZoneInfo(CALENDAR_TIMEZONE) if CALENDAR_TIMEZONE else timezone.utc
+    when = {"dateTime": moment.astimezone(zone).isoformat()}
+    if CALENDAR_TIMEZONE or recurring:
+        # Google needs a zone name to expand recurring events
+        when["timeZone"] = CALENDAR_TIMEZONE or "UTC"
+    return when
+
+
+def to_calendar_event(item: dict):
+    """Calendar API body for an extracted event (with iCalUID and fingerprint), or None if undated."""
+    rule = rule_from_item(item)
+    if rule is None:
+        return None
+    title = (item.get("title") or "").strip() or "(untitled)"
+    all_day = len(str(item.get("start") or item.get("due_date") or "").strip()) <= 10 and not item.get("time_start")
+    end = rule.start + rule.duration
+    if rule.duration.total_seconds() == 0:
+        end = rule.start + (_DAY if all_day else _HOUR)
+
+    body = {
+        "summary": title,
+        "start": _when(rule.start, all_day, bool(rule.unit)),
+        "end": _when(end, all_day, bool(rule.unit)),
+    }
+    for field in ("location", "description"):
+        if item.get(field):
+            body[field] = item[field]
+    if rule.unit:
+        body["recurrence"] = [_rrule(rule, all_day)]
+
+    fingerprint = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+    # Identity is title + first start, so a re-extracted (edited) event updates in place
+    identity = hashlib.sha256(f"{title.lower()}\x1f{rule.start.isoformat()}".encode("utf-8")).hexdigest()[:32]
+    body["iCalUID"] = f"{identity}@geminidesk"
+    body["extendedProperties"] = {"private": {FINGERPRINT_KEY: fingerprint}}
+    return body
+
+
+# -- local cache ------------------------------------------------------------
+
+class EventCache:
+    """Local copy of a calendar's events plus the sync token to resume from."""
+
+    def __init__(self, path=CALENDAR_CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "calendar_id TEXT, id TEXT, ical_uid TEXT, fingerprint TEXT, data TEXT, "
+            "PRIMARY KEY (calendar_id, id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_uid ON events(calendar_id, ical_uid)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state (calendar_id TEXT PRIMARY KEY, sync_token TEXT, synced REAL)"
+        )
+
+    def sync_token(self, calendar_id):
+        row = self._db.execute("SELECT sync_token FROM state WHERE calendar_id = ?", (calendar_id,)).fetchone()
+        return row[0] if row else None
+
+    def reset(self, calendar_id):
+        self._db.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+        self._db.execute("DELETE FROM state WHERE calendar_id = ?", (calendar_id,))
+
+    def apply(self, calendar_id, events, sync_token=None):
+        """Upsert changed events, drop cancelled ones, and remember where to resume."""
+        self._db.execute("BEGIN")
+        try:
+            for event in events:
+                if event.get("status") == "cancelled":
+                    self._db.execute("DELETE FROM events WHERE calendar_id = ? AND id = ?", (calendar_id, event["id"]))
+                    continue
+                fingerprint = ((event.get("extendedProperties") or {}).get("private") or {}).get(FINGERPRINT_KEY)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)",
+                    (calendar_id, event["id"], event.get("iCalUID"), fingerprint, json.dumps(event)),
+                )
+            if sync_token:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO state VALUES (?, ?, ?)", (calendar_id, sync_token, time.time())
+                )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def by_uid(self, calendar_id) -> dict:
+        rows = self._db.execute(
+            "SELECT ical_uid, id, fingerprint FROM events WHERE calendar_id = ? AND ical_uid IS NOT NULL",
+            (calendar_id,),
+        )
+        return {uid: (event_id, fingerprint) for uid, event_id, fingerprint in rows}
+
+    def count(self, calendar_id) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM events WHERE calendar_id = ?", (calendar_id,)).fetchone()[0]
+
+
+# -- sync -------------------------------------------------------------------
+
+class CalendarSync:
+    """
+    pull() brings the local cache up to date (full listing the first time or
+    after a 410, then just the delta since the last sync token); push(items)
+    inserts/patches only the extracted events the calendar doesn't already
+    have in that exact form, CALENDAR_BATCH_SIZE calls per HTTP request.
+    """
+
+    def __init__(self, calendar_id=CALENDAR_ID, service=None, cache=None, batch_size=CALENDAR_BATCH_SIZE):
+        self.calendar_id = calendar_id
+        self.service = service or get_service()
+        self.cache = cache or EventCache()
+        self.batch_size = batch_size
+
+    def pull(self) -> dict:
+        from googleapiclient.errors import HttpError
+
+        token = self.cache.sync_token(self.calendar_id)
+        full = token is None
+        requests, changed, page_token = 0, 0, None
+        while True:
+            params = {"calendarId": self.calendar_id, "maxResults": 2500, "showDeleted": True}
+            if page_token:
+                params["pageToken"] = page_token
+            elif token:
+                params["syncToken"] = token
+            try:
+                response = self.service.events().list(**params).execute()
+            except HttpError as e:
+                if _status(e) != 410 or full:
+                    raise
+                # Sync token expired: start over with a full listing
+                print("[Calendar] Sync token expired, doing a full resync")
+                self.cache.reset(self.calendar_id)
+                token, full, page_token = None, True, None
+                continue
+            requests += 1
+            items = response.get("items", [])
+            changed += len(items)
+            self.cache.apply(self.calendar_id, items, response.get("nextSyncToken"))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return {"requests": requests, "changed": changed, "full": full, "cached": self.cache.count(self.calendar_id)}
+
+    def plan(self, items) -> tuple:
+        """Split extracted events into (inserts, patches as (event_id, body), skipped count)."""
+        known = self.cache.by_uid(self.calendar_id)
+        inserts, patches, skipped, seen = [], [], 0, set()
+        for item in items:
+            body = to_calendar_event(item)
+            if body is None or body["iCalUID"] in seen:
+                skipped += 1
+                continue
+            seen.add(body["iCalUID"])
+            existing = known.get(body["iCalUID"])
+            if existing is None:
+                inserts.append(body)
+            elif existing[1] != body["extendedProperties"]["private"][FINGERPRINT_KEY]:
+                patches.append((existing[0], body))
+            else:
+                skipped += 1
+        return inserts, patches, skipped
+
+    def push(self, items) -> dict:
+        inserts, patches, skipped = self.plan(items)
+        events = self.service.events()
+        calls = [events.insert(calendarId=self.calendar_id, body=body) for body in inserts]
+        calls += [events.patch(calendarId=self.calendar_id, eventId=event_id, body=body) for event_id, body in patches]
+
+        written, errors = [], []
+
+        def done(request_id, response, exception):
+            if exception is not None:
+                # 409: the calendar already has this iCalUID (e.g. deleted there); leave it alone
+                if _status(exception) != 409:
+                    errors.append(str(exception))
+            else:
+                written.append(response)
+
+        batches = 0
+        for i in range(0, len(calls), self.batch_size):
+            batch = _new_batch(self.service, done)
+            for call in calls[i:i + self.batch_size]:
+                batch.add(call)
+            batch.execute()
+            batches += 1
+        if written:
+            self.cache.apply(self.calendar_id, written)
+        for message in errors[:5]:
+            print(f"[Calendar] Write failed: {message}")
+        if len(errors) > 5:
+            print(f"[Calendar] ...and {len(errors) - 5} more failed writes")
+        return {
+            "inserted": len(inserts),
+            "updated": len(patches),
+            "skipped": skipped,
+            "errors": len(errors),
+            "error_messages": errors,
+            "batches": batches,
+        }
+
+    def sync(self, items=()) -> dict:
+        return {"pull": self.pull(), "push": self.push(items)}
+
+
+def extracted_events() -> list:
+    """EventAgent output from the document store."""
+    from app.utils.store import get_store
+    return [json.loads(row["data"]) for row in get_store().events(limit=-1)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync extracted events with Google Calendar")
+    parser.add_argument("--calendar", default=CALENDAR_ID)
+    parser.add_argument("--pull-only", action="store_true", help="only refresh the local cache")
+    args = parser.parse_args()
+
+    sync = CalendarSync(args.calendar)
+    if args.pull_only:
+        print(f"[Calendar] {sync.pull()}")
+    else:
+        print(f"[Calendar] {sync.sync(extracted_events())}")
@@ -0,0 +1,115 @@
+# app/agents/chunking.py
+import json
+import os
+import re
+
+# Longest text sent to the model in one prompt; longer input is split and mapped over
+CHUNK_CHARS = int(os.getenv("CHUNK_CHARS", "4000"))
+
+# Preferred split points, strongest first: extract_text's "# Page N" markers,
+# other Markdown headings, paragraphs, lines, words
+_SEPARATORS = [
+    re.compile(r"(?=^# Page \d+\s*$)", re.M),
+    re.compile(r"(?=^#{1,3} )", re.M),
+    re.compile(r"\n\s*\n"),
+    re.compile(r"\n"),
+    re.compile(r" "),
+]
+
+
+def _split(text: str, max_chars: int, level: int = 0) -> list:
+    if len(text) <= max_chars:
+        return [text]
+    if level >= len(_SEPARATORS):
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    pieces = []
+    for part in _SEPARATORS[level].split(text):
+        if not part.strip():
+            continue
+        if len(part) > max_chars:
+            pieces.extend(_split(part, max_chars, level + 1))
+        else:
+            pieces.append(part)
+
+    # Pack neighbouring pieces back together up to max_chars
+    chunks, current = [], ""
+    for piece in pieces:
+        joiner = "\n\n" if current else ""
+        if len(current) + len(joiner) + len(piece) <= max_chars:
+            current += joiner + piece
+        else:
+            if current:
+                chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_text(text: str, max_chars: int = CHUNK_CHARS) -> list:
+    """Split text into chunks of at most max_chars, on the most semantic boundary available."""
+    return [chunk.strip() for chunk in _split(text.strip(), max_chars) if chunk.strip()]
+
+
+def sample_text(text: str, max_chars: int = CHUNK_CHARS) -> str:
+    """
+    Budget-limited view of a long document for routing: the start of every chunk
+    instead of only the first max_chars, so later pages still get a say.
+    """
+    if len(text) <= max_chars:
+        return text
+    chunks = split_text(text, max_chars)
+    share = max(200, max_chars // len(chunks))
+    return "\n...\n".join(chunk[:share] for chunk in chunks)[:max_chars]
+
+
+def _norm(value) -> str:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return json.dumps(value, sort_keys=True)
+
+
+def merge_items(items, keys) -> list:
+    """
+    Merge per-chunk extraction results. Items with the same normalized `keys`
+    are the same item seen in two chunks; blanks in the first copy get filled in from later ones.
+    """
+    merged, index = [], {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        key = tuple(_norm(item.get(k)) for k in keys)
+        if not any(item.get(k) for k in keys):
+            # No identifying fields, so only drop exact duplicates
+            key = ("__raw__", _norm(item))
+        existing = index.get(key)
+        if existing is None:
+            index[key] = dict(item)
+            merged.append(index[key])
+            continue
+        for field, value in item.items():
+            if existing.get(field) in (None, "", [], {}):
+                existing[field] = value
+    return merged
+
+
+def merge_chunks(results, keys) -> dict:
+    """
+    Combine per-chunk item lists from gather(..., return_exceptions=True) into
+    {"items": [...], "chunks": n}. Failed chunks are listed under "failed_chunks"
+    instead of sinking the document; only if every chunk failed is the first error raised.
+    """
+    items, failed = [], []
+    for i, res in enumerate(results):
+        if isinstance(res, BaseException):
+            failed.append(i)
+        else:
+            items.extend(res)
+    if results and len(failed) == len(results):
+        raise results[0]
+
+    merged = {"items": merge_items(items, keys), "chunks": len(results)}
+    if failed:
+        merged["failed_chunks"] = failed
+    return merged
@@ -0,0 +1,204 @@
+# app/agents/ingest.py
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+from app.agents.ocr_agent import DATA_DIR
+from app.utils.cache import CACHE_DIR, file_digest
+
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST", os.path.join(CACHE_DIR, "manifest.sqlite3"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))
+WATCH_INTERVAL = float(os.getenv("INGEST_WATCH_INTERVAL", "5"))
+
+
+def scan(root: str):
+    """Yield (path, size, mtime_ns) for every file under root, stat-only (no reads)."""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat()
+                    yield entry.path, st.st_size, st.st_mtime_ns
+
+
+class Manifest:
+    """What we've already ingested: path, size, mtime, content hash and last result."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT, "
+            "result TEXT, error TEXT, processed REAL)"
+        )
+
+    def load(self) -> dict:
+        rows = self._db.execute("SELECT path, size, mtime_ns, hash, error FROM files")
+        return {path: (size, mtime_ns, digest, error) for path, size, mtime_ns, digest, error in rows}
+
+    def record(self, path, size, mtime_ns, digest, result=None, error=None):
+        self._db.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, digest, json.dumps(result) if result is not None else None, error, time.time()),
+        )
+
+    def touch(self, path, size, mtime_ns):
+        self._db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path))
+
+    def forget(self, paths):
+        self._db.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+
+    def result(self, path):
+        row = self._db.execute("SELECT result FROM files WHERE path = ?", (path,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+
+_pipeline = None
+
+
+async def _pipeline_process(path: str) -> dict:
+    # Default processor: the same extract -> route -> parse pipeline as UploadPanel
+    from app.agents.pipeline import IngestPipeline
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = IngestPipeline()
+    return await _pipeline.process_file(path)
+
+
+class IngestService:
+    """
+    Incremental ingestion of a directory tree. Unchanged files (same size and
+    mtime) are skipped without being read; touched-but-identical files are
+    recognised by hash and skipped too. Only new or changed content is processed.
+    """
+
+    def __init__(self, root=DATA_DIR, process=_pipeline_process, manifest=None,
+                 concurrency=INGEST_CONCURRENCY, retry_errors=False):
+        self.root = os.path.abspath(root)
+        self.process = process
+        self.manifest = manifest or Manifest()
+        self.concurrency = concurrency
+        self.retry_errors = retry_errors
+
+    async def run_once(self) -> dict:
+        started = time.perf_counter()
+        known = self.manifest.load()
+        seen, changed = set(), []
+        for path, size, mtime_ns in scan(self.root):
+            seen.add(path)
+            prev = known.get(path)
+            retry = self.retry_errors and prev and prev[3]
+            if prev and prev[0] == size and prev[1] == mtime_ns and not retry:
+                continue
+            changed.append((path, size, mtime_ns, prev[2] if prev and not retry else None))
+
+        # root + sep, so a sibling like data2/ doesn't count as being under data/
+        prefix = os.path.join(self.root, "")
+        removed = [path for path in known if path not in seen and path.startswith(prefix)]
+        if removed:
+            self.manifest.forget(removed)
+
+        sem = asyncio.Semaphore(self.concurrency)
+        counts = {"processed": 0, "rehashed": 0, "vanished": 0, "errors": 0}
+
+        async def handle(path, size, mtime_ns, old_digest):
+            async with sem:
+                try:
+                    digest = await asyncio.to_thread(file_digest, path)
+                except OSError:
+                    # Deleted (or locked) since the scan, e.g. an editor temp file; the next pass forgets it
+                    counts["vanished"] += 1
+                    return
+                if digest == old_digest:
+                    # Only the mtime moved; the content (and our result) is the same
+                    self.manifest.touch(path, size, mtime_ns)
+                    counts["rehashed"] += 1
+                    return
+                try:
+                    result = await self.process(path)
+                    error = result.get("error") if isinstance(result, dict) else None
+                except Exception as e:
+                    result, error = None, str(e)
+                self.manifest.record(path, size, mtime_ns, digest, result, error)
+                counts["errors" if error else "processed"] += 1
+                print(f"[Ingest] {'❌' if error else '✅'} {os.path.relpath(path, self.root)}"
+                      + (f": {error}" if error else ""))
+
+        await asyncio.gather(*(handle(*item) for item in changed))
+        return {
+            "files": len(seen),
+            "changed": len(changed),
+            "removed": len(removed),
+            **counts,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def watch(self, interval=WATCH_INTERVAL):
+        """Re-run whenever something under root changes (watchdog if installed, else polling)."""
+        wake = asyncio.Event()
+        observer = self._start_watchdog(wake)
+        try:
+            while True:
+                try:
+                    summary = await self.run_once()
+                    if summary["changed"] or summary["removed"]:
+                        print(f"[Ingest] {summary}")
+                except Exception as e:
+                    # One bad pass mustn't end the watcher; the next one rescans everything anyway
+                    print(f"[Ingest] Pass failed: {e}")
+                try:
+                    await asyncio.wait_for(wake.wait(), interval)
+                    # Let a burst of writes settle before rescanning
+                    await asyncio.sleep(0.5)
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+        finally:
+            if observer is not None:
+                observer.stop()
+
+    def _start_watchdog(self, wake: asyncio.Event):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+        loop = asyncio.get_running_loop()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                loop.call_soon_threadsafe(wake.set)
+
+        observer = Observer()
+        observer.schedule(Handler(), self.root, recursive=True)
+        observer.start()
+        return observer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest a data directory")
+    parser.add_argument("root", nargs="?", default=DATA_DIR)
+    parser.add_argument("--watch", action="store_true", help="keep running and pick up changes")
+    parser.add_argument("--retry-errors", action="store_true", help="reprocess files that failed last time")
+    args = parser.parse_args()
+
+    service = IngestService(args.root, retry_errors=args.retry_errors)
+    print(f"\n📂 Ingesting: {service.root}")
+    if args.watch:
+        asyncio.run(service.watch())
+    else:
+        print(f"[Ingest] {asyncio.run(service.run_once())}")
@@ -1,13 +1,206 @@
 # app/agents/ocr_agent.py
+import asyncio
+import contextvars
 import os
-from PIL import Image
-import google.generativeai as genai
-from io import BytesIO
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+from app.agents import preprocess
+from app.utils.cache import file_digest, get_cache, make_key
+from app.utils.metrics import inc, span
+from app.utils.scheduler import estimate_tokens, get_scheduler
+
+DATA_DIR = os.getenv(
+    "GEMINIDESK_DATA_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data")),
+)
+
+MODEL_NAME = "models/gemini-2.5-flash"
+IMAGE_PROMPT = (
+    "Extract all visible text, labels, equations, and diagram captions "
+    "from this image as Markdown. Use $$...$$ for math and Markdown formatting."
+)
+PDF_PAGE_PROMPT = "Extract all text and diagrams from page {page} as Markdown."
+
+# How many pages get rasterized at once, and how many OCR calls may be in flight
+PDF_WINDOW = int(os.getenv("OCR_PDF_WINDOW", "4"))
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "4"))
+
+# A PDF page with at least this much embedded text is used as-is instead of OCR'd;
+# pages that also carry images need OCR_FIGURE_MIN_CHARS, or the figures get OCR'd
+OCR_TEXT_MIN_CHARS = int(os.getenv("OCR_TEXT_MIN_CHARS", "20"))
+OCR_FIGURE_MIN_CHARS = int(os.getenv("OCR_FIGURE_MIN_CHARS", "400"))
+
+
+def _has_images(page) -> bool:
+    try:
+        xobjects = page["/Resources"]["/XObject"].get_object()
+    except Exception:
+        return False
+    return any(xobjects[name].get_object().get("/Subtype") == "/Image" for name in xobjects)
+
+
+def read_text_layer(file_path: str):
+    """
+    Read the embedded text of a PDF with pypdf.
+    Returns (page_count, {page_number: text}) holding only pages that don't need OCR,
+    or (None, {}) when pypdf isn't installed or can't parse the file.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None, {}
+    try:
+        reader = PdfReader(file_path)
+        pages = {}
+        for i, page in enumerate(reader.pages, 1):
+            text = (page.extract_text() or "").strip()
+            needed = OCR_FIGURE_MIN_CHARS if _has_images(page) else OCR_TEXT_MIN_CHARS
+            if text and len(text) >= needed:
+                pages[i] = text
+        return len(reader.pages), pages
+    except Exception as e:
+        print(f"[Gemini OCR] Text layer unreadable, OCR'ing every page: {e}")
+        return None, {}
+
+
+_genai = None
+_genai_lock = threading.Lock()
+_model = None
+
+
+def load_genai():
+    """
+    google.generativeai, imported and configured on first use. It takes about
+    a second to import, which the console shouldn't pay before its first frame.
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                base = os.getenv("GEMINI_API_BASE")
+                if base:
+                    # Stand-in server: REST, since it doesn't speak gRPC
+                    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"), transport="rest",
+                                    client_options={"api_endpoint": base.rstrip("/")})
+                else:
+                    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+                _genai = genai
+    return _genai
+
+
+def _get_model():
+    """Build the GenerativeModel once and reuse it for every file and page."""
+    global _model
+    if _model is None:
+        _model = load_genai().GenerativeModel(MODEL_NAME)
+    return _model
+
+
+def _ocr_page(model, cache, key, prompt, data: bytes) -> str:
+    parts = [prompt, {"mime_type": "image/jpeg", "data": data}]
+    inc("upload.bytes", len(data))
+    with span("ocr.page"):
+        response = get_scheduler().call(model.generate_content, parts, tokens=estimate_tokens(parts))
+        text = response.text.strip()
+    cache.set(key, text)
+    return text
+
+
+def iter_pdf_pages(file_path: str, concurrency: int = OCR_CONCURRENCY, window: int = PDF_WINDOW):
+    """
+    Yield (page_number, markdown) for each PDF page, in page order.
+    Pages are rasterized `window` at a time and OCR'd up to `concurrency` at once,
+    so only a bounded number of page images is alive no matter how long the PDF is.
+    Pages with a usable embedded text layer skip rasterizing and OCR entirely.
+    """
+    fname = os.path.basename(file_path)
+    digest = file_digest(file_path)
+    n_pages, text_pages = read_text_layer(file_path)
+    if n_pages is None:
+        from pdf2image import pdfinfo_from_path
+        n_pages = pdfinfo_from_path(file_path)["Pages"]
+    elif len(text_pages) == n_pages:
+        print(f"[Gemini OCR] {fname}: text layer covers all {n_pages} pages, no OCR needed")
+        for i in range(1, n_pages + 1):
+            yield i, text_pages[i]
+        return
+    model = _get_model()
+    cache = get_cache()
+
+    # Look pages up first (text layer, then cache); whatever is left needs OCR
+    windows = []
+    for start in range(1, n_pages + 1, window):
+        slots = {}
+        for i in range(start, min(start + window - 1, n_pages) + 1):
+            if i in text_pages:
+                slots[i] = text_pages.pop(i)
+            else:
+                slots[i] = cache.get(make_key(digest, MODEL_NAME, PDF_PAGE_PROMPT.format(page=i), i))
+        # Cached pages are never rasterized or sent again
+        windows.append((slots, [i for i, text in slots.items() if text is None]))
+
+    def rasterize(todo):
+        if not todo:
+            return None
+        print(f"[Gemini OCR] Converting {fname} pages {todo[0]}-{todo[-1]}/{n_pages}...")
+        return preprocess.submit(preprocess.rasterize_pages, file_path, todo[0], todo[-1])
+
+    pending = deque()  # (page, text or Future), kept in page order
+    next_raster = rasterize(windows[0][1]) if windows else None
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for k, (slots, todo) in enumerate(windows):
+            raster = next_raster
+            # Rasterize the next window in the process pool while this one is OCR'd
+            next_raster = rasterize(windows[k + 1][1]) if k + 1 < len(windows) else None
+            if raster is not None:
+                # Only the part of rasterizing we actually wait for
+                with span("preprocess.pdf_window"):
+                    images = raster.result()
+                for i, data in zip(range(todo[0], todo[-1] + 1), images):
+                    if i not in todo:
+                        continue
+                    prompt = PDF_PAGE_PROMPT.format(page=i)
+                    key = make_key(digest, MODEL_NAME, prompt, i)
+                    # Carry the caller's scheduler priority into the worker thread
+                    ctx = contextvars.copy_context()
+                    slots[i] = pool.submit(ctx.run, _ocr_page, model, cache, key, prompt, data)
+
+            pending.extend(slots.items())
+
+            # Hand back finished pages, and stop rasterizing ahead while the pool is saturated
+            while pending:
+                page_no, slot = pending[0]
+                in_flight = sum(1 for _, s in pending if not isinstance(s, str) and not s.done())
+                if isinstance(slot, str) or slot.done() or in_flight >= concurrency:
+                    pending.popleft()
+                    yield page_no, slot if isinstance(slot, str) else slot.result()
+                else:
+                    break
+
+        while pending:
+            page_no, slot = pending.popleft()
+            yield page_no, slot if isinstance(slot, str) else slot.result()
+
+
+async def aiter_pdf_pages(file_path: str, **kwargs):
+    """Async version of iter_pdf_pages; rasterizing and OCR run off the event loop."""
+    pages = iter_pdf_pages(file_path, **kwargs)
+    done = object()
+    while True:
+        # to_thread, not run_in_executor: the caller's scheduler priority has to come along
+        item = await asyncio.to_thread(next, pages, done)
+        if item is done:
+            break
+        yield item
+
+
+def page_markdown(page: int, text: str) -> str:
+    """One PDF page of extracted text, under the "# Page N" heading chunking splits on."""
+    return f"\n\n# Page {page}\n{text}"
 
-DATA_DIR = r"C:\Users\nehah\GeminiDesk\GeminiDesk\data"
 
 def extract_text(file_path: str) -> str:
     """Extract text or OCR content from any file using Gemini."""
@@ -15,8 +208,6 @@ def extract_text(file_path: str) -> str:
     fname = os.path.basename(file_path)
     print(f"[Gemini OCR] Processing: {fname}")
 
-    model = genai.GenerativeModel("models/gemini-2.5-flash")
-
     # Handle text directly
     if ext in [".txt", ".md", ".csv"]:
         with open(file_path, "r", encoding="utf-8") as f:
@@ -24,40 +215,33 @@ def extract_text(file_path: str) -> str:
 
     # Handle images
     elif ext in [".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".webp"]:
-        prompt = (
-            "Extract all visible text, labels, equations, and diagram captions "
-            "from this image as Markdown. Use $$...$$ for math and Markdown formatting."
-        )
-
-        # ✅ Force-clean the image buffer (prevents MPO issue)
-        with Image.open(file_path) as img:
-            if hasattr(img, "n_frames") and img.n_frames > 1:
-                img.seek(0)
-            img = img.convert("RGB")
-            buffer = BytesIO()
-            img.save(buffer, format="JPEG")
-            buffer.seek(0)
-
-        response = model.generate_content(
-            [prompt, {"mime_type": "image/jpeg", "data": buffer.read()}]
-        )
-        return response.text.strip()
+        cache = get_cache()
+        key = make_key(file_digest(file_path), MODEL_NAME, IMAGE_PROMPT)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"[Gemini OCR] Cache hit: {fname}")
+            return cached
+
+        # Decode / downscale / re-encode happens in the preprocessing process pool
+        with span("preprocess.image"):
+            data, stats = preprocess.run(preprocess.encode_image, file_path)
+        saved = stats["source_bytes"] - stats["sent_bytes"]
+        inc("upload.bytes", stats["sent_bytes"])
+        inc("upload.bytes_saved", saved)
+        print(f"[Gemini OCR] {fname}: uploading {stats['sent_bytes'] // 1024} KB "
+              f"({'re-encoded' if stats['reencoded'] else 'as-is'}, {saved // 1024} KB saved)")
+        parts = [IMAGE_PROMPT, {"mime_type": stats["mime_type"], "data": data}]
+        with span("ocr.image"):
+            response = get_scheduler().call(_get_model().generate_content, parts, tokens=estimate_tokens(parts))
+            text = response.text.strip()
+        cache.set(key, text)
+        return text
 
     # Handle PDFs
     elif ext == ".pdf":
-        from pdf2image import convert_from_path
-        print(f"[Gemini OCR] Converting PDF to images...")
-        pages = convert_from_path(file_path)
         text = ""
-        for i, page in enumerate(pages):
-            buf = BytesIO()
-            page.save(buf, format="JPEG")
-            buf.seek(0)
-            response = model.generate_content([
-                f"Extract all text and diagrams from page {i+1} as Markdown.",
-                {"mime_type": "image/jpeg", "data": buf.read()}
-            ])
-            text += f"\n\n# Page {i+1}\n{response.text.strip()}"
+        for i, page_text in iter_pdf_pages(file_path):
+            text += page_markdown(i, page_text)
         return text.strip()
 
     else:
@@ -65,13 +249,16 @@ def extract_text(file_path: str) -> str:
         return ""
 
 if __name__ == "__main__":
-    for file in os.listdir(DATA_DIR):
-        file_path = os.path.join(DATA_DIR, file)
-        if not os.path.isfile(file_path):
-            continue
-        try:
-            text = extract_text(file_path)
-            if text:
-                print(f"\n--- Extracted from {file} ---\n{text[:500]}...\n")
-        except Exception as e:
-            print(f"[Gemini OCR] Error on {file}: {e}")
+    from app.agents.ingest import IngestService, Manifest
+    from app.utils.cache import CACHE_DIR
+
+    async def ocr_only(path):
+        text = await asyncio.to_thread(extract_text, path)
+        if text:
+            print(f"\n--- Extracted from {os.path.basename(path)} ---\n{text[:500]}...\n")
+        return {"chars": len(text)}
+
+    # Own manifest, so an OCR-only run doesn't mark files as routed
+    service = IngestService(DATA_DIR, process=ocr_only, manifest=Manifest(os.path.join(CACHE_DIR, "ocr_manifest.sqlite3")))
+    print(f"[Gemini OCR] {asyncio.run(service.run_once())}")
+    print(f"[Gemini OCR] Cache: {get_cache().stats()}")
@@ -0,0 +1,179 @@
+# app/agents/pipeline.py
+import asyncio
+import json
+import os
+import time
+
+from app.agents.chunking import CHUNK_CHARS, merge_chunks, split_text
+from app.agents.ocr_agent import aiter_pdf_pages, extract_text, page_markdown
+from app.agents.pre_classifier import get_pre_classifier
+from app.agents.recurrence import index_document
+from app.agents.router_agent import (
+    ROUTER_LOCAL_THRESHOLD, extract_fields, extract_many, route_and_extract, route_text,
+)
+from app.agents.schemas import DEDUP_KEYS
+from app.utils.budget import get_budget
+from app.utils.cache import file_digest
+from app.utils.metrics import inc, observe, span
+from app.utils.store import get_store, items_of
+
+# Max files in each stage at once; extract is the heavy one (PIL/pdf + OCR)
+EXTRACT_CONCURRENCY = int(os.getenv("PIPELINE_EXTRACT_CONCURRENCY", "4"))
+ROUTE_CONCURRENCY = int(os.getenv("PIPELINE_ROUTE_CONCURRENCY", "8"))
+PARSE_CONCURRENCY = int(os.getenv("PIPELINE_PARSE_CONCURRENCY", "8"))
+
+# Route and extract with one model call; the two-step path is only the fallback
+COMBINED = os.getenv("PIPELINE_COMBINED", "1") == "1"
+
+
+async def parse_for_agent(agent: str, text: str) -> dict:
+    """
+    Two-step path: agent-specific extraction after routing.
+    Long text is extracted chunk by chunk in parallel and merged into
+    {"items": [...], "chunks": n}, plus "failed_chunks" if some chunks failed.
+    """
+    with span("parse", agent=agent):
+        return await _parse_for_agent(agent, text)
+
+
+async def _parse_for_agent(agent: str, text: str) -> dict:
+    if agent == "TaskAgent":
+        from app.agents.task_agent import extract_task
+        return await extract_task(text)
+    if len(text) <= CHUNK_CHARS:
+        return await asyncio.to_thread(extract_fields, agent, text)
+
+    chunks = split_text(text)
+    results = await asyncio.gather(
+        *(asyncio.to_thread(extract_many, agent, c) for c in chunks), return_exceptions=True
+    )
+    return merge_chunks(results, DEDUP_KEYS[agent])
+
+
+def _local_confidence(text: str) -> float:
+    # First use loads the classifier's weights from disk
+    return get_pre_classifier().classify(text)["confidence"]
+
+
+def _record(agent: str, doc_id: int, items: list):
+    """Fold a stored document into the agenda index and the budget (either may read SQLite on first use)."""
+    if agent in ("TaskAgent", "EventAgent"):
+        index_document(doc_id, items)
+    get_budget().add_result(agent, items)
+
+
+class IngestPipeline:
+    """
+    Runs uploaded files through extract -> route -> agent parse, concurrently.
+    Each stage has its own semaphore, so a slow OCR doesn't hold up routing of
+    files that are already extracted. Progress goes to logs_queue / router_signal.
+    """
+
+    def __init__(self, logs_queue=None, router_signal=None,
+                 extract_concurrency=EXTRACT_CONCURRENCY,
+                 route_concurrency=ROUTE_CONCURRENCY,
+                 parse_concurrency=PARSE_CONCURRENCY):
+        self.logs_queue = logs_queue
+        self.router_signal = router_signal
+        self._extract = asyncio.Semaphore(extract_concurrency)
+        self._route = asyncio.Semaphore(route_concurrency)
+        self._parse = asyncio.Semaphore(parse_concurrency)
+
+    async def _log(self, name: str, stage: str, **fields):
+        if self.logs_queue is not None:
+            await self.logs_queue.put(json.dumps({"file": name, "stage": stage, **fields}))
+
+    async def _route_text(self, text: str) -> dict:
+        async with self._route:
+            with span("pipeline.route"):
+                return await asyncio.to_thread(route_text, text)
+
+    async def _extract_pdf(self, path: str) -> tuple:
+        """
+        OCR a PDF page by page. Once the pages so far are past CHUNK_CHARS (so
+        the document goes the two-step way regardless), routing starts on them
+        while the remaining pages are still being OCR'd. Returns (text, route task or None).
+        """
+        text, routing = "", None
+        try:
+            async for i, page_text in aiter_pdf_pages(path):
+                text += page_markdown(i, page_text)
+                if routing is None and len(text) > CHUNK_CHARS:
+                    routing = asyncio.create_task(self._route_text(text.strip()))
+        except BaseException:
+            if routing is not None:
+                routing.cancel()
+            raise
+        return text.strip(), routing
+
+    async def process_file(self, path: str, name: str = None) -> dict:
+        name = name or os.path.basename(path)
+        result = {"name": name, "path": path}
+        started = time.perf_counter()
+        inc("pipeline.files")
+        try:
+            # Same bytes we've already extracted, routed and parsed: serve it from the store
+            digest = result["sha256"] = await asyncio.to_thread(file_digest, path)
+            stored = await asyncio.to_thread(get_store().get_by_hash, digest)
+            if stored and stored["route"] and stored["parsed"] is not None:
+                result.update(route=stored["route"], parsed=stored["parsed"])
+                await self._log(name, "stored", agent=stored["route"].get("agent"))
+                inc("pipeline.stored")
+                if self.router_signal is not None:
+                    await self.router_signal.put({"file": name, **stored["route"]})
+                return result
+
+            routing = None
+            async with self._extract:
+                await self._log(name, "extract")
+                with span("pipeline.extract"):
+                    if path.lower().endswith(".pdf"):
+                        text, routing = await self._extract_pdf(path)
+                    else:
+                        text = await asyncio.to_thread(extract_text, path)
+            if not text.strip():
+                if routing is not None:
+                    routing.cancel()
+                result["error"] = "No text extracted"
+                await self._log(name, "skipped", reason=result["error"])
+                return result
+            await self._log(name, "extracted", chars=len(text))
+
+            route, parsed, mode = None, None, "two-step"
+            if routing is not None:
+                # Routed on the leading pages while the rest were extracted
+                route, mode = await routing, "early"
+            # A confident local route is free, so only pay for the combined call otherwise.
+            # Long text goes the two-step way so extraction can be chunked.
+            elif (COMBINED and len(text) <= CHUNK_CHARS
+                    and await asyncio.to_thread(_local_confidence, text) < ROUTER_LOCAL_THRESHOLD):
+                async with self._route:
+                    combined = await asyncio.to_thread(route_and_extract, text)
+                if combined is not None:
+                    parsed = combined.pop("extraction")
+                    route, mode = combined, "combined"
+            if route is None:
+                route = await self._route_text(text)
+
+            result["route"] = route
+            await self._log(name, "routed", agent=route.get("agent"), confidence=route.get("confidence"), mode=mode)
+            if self.router_signal is not None:
+                await self.router_signal.put({"file": name, **route})
+
+            if parsed is None:
+                async with self._parse:
+                    parsed = await parse_for_agent(route.get("agent"), text)
+            result["parsed"] = parsed
+            await self._log(name, "parsed", agent=route.get("agent"))
+            doc_id = await asyncio.to_thread(get_store().add_document, name, text, path, digest, route, parsed)
+            await asyncio.to_thread(_record, route.get("agent"), doc_id, items_of(parsed))
+        except Exception as e:
+            result["error"] = str(e)
+            inc("pipeline.errors")
+            await self._log(name, "error", error=str(e))
+        observe("pipeline.file", time.perf_counter() - started)
+        return result
+
+    async def run(self, files) -> list:
+        """Process (path, name) pairs concurrently; results come back in input order."""
+        return await asyncio.gather(*(self.process_file(path, name) for path, name in files))
@@ -0,0 +1,174 @@
+# app/agents/pre_classifier.py
+import atexit
+import json
+import os
+import re
+import threading
+
+from app.agents.schemas import AGENTS
+from app.utils.cache import CACHE_DIR
+
+MODEL_PATH = os.getenv("ROUTER_LOCAL_MODEL", os.path.join(CACHE_DIR, "pre_classifier.json"))
+
+# Hand-picked starting vocabulary; learned weights from past Gemini routes get added on top
+SEED_KEYWORDS = {
+    "NoteAgent": [
+        "notes", "lecture", "chapter", "summary", "definition", "theorem", "equation",
+        "proof", "example", "diagram", "figure", "reading", "concept", "idea", "ideas",
+    ],
+    "FinanceAgent": [
+        "receipt", "total", "subtotal", "tax", "tip", "paid", "payment", "invoice",
+        "amount", "balance", "change", "cash", "card", "visa", "mastercard", "qty",
+        "price", "budget", "expense", "refund", "__money__",
+    ],
+    "TaskAgent": [
+        "task", "tasks", "todo", "deadline", "due", "assignment", "goal", "next",
+        "step", "steps", "prep", "review", "draft", "finish", "submit", "quarter",
+        "timeline", "agenda", "milestone", "priority",
+    ],
+    "EventAgent": [
+        "event", "invite", "invited", "rsvp", "register", "registering", "registration",
+        "attend", "location", "when", "venue", "seats", "join", "meetup", "conference",
+        "workshop", "office", "__time__", "__date__",
+    ],
+}
+SEED_WEIGHT = 2.0
+# Added to the denominator of the confidence so a single keyword hit is never enough
+PRIOR = 2.0
+# A learned token needs this many documents, and this share of them routed to one agent
+MIN_DOCS = 3
+MIN_SHARE = 0.6
+SAVE_EVERY = 20
+
+_WORD = re.compile(r"[a-z][a-z']+")
+_MONEY = re.compile(r"[$€£]\s?\d+(?:[.,]\d{2})?|\d+[.,]\d{2}\b")
+_TIME = re.compile(r"\b\d{1,2}(?::\d{2})?\s?(?:am|pm)\b")
+_DATE = re.compile(
+    r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b"
+    r"|\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b"
+)
+
+
+def tokenize(text: str) -> set:
+    text = text.lower()
+    tokens = set(_WORD.findall(text))
+    if _MONEY.search(text):
+        tokens.add("__money__")
+    if _TIME.search(text):
+        tokens.add("__time__")
+    if _DATE.search(text):
+        tokens.add("__date__")
+    return tokens
+
+
+class PreClassifier:
+    """
+    Cheap local router. Scores each agent by summing keyword weights over the
+    document's distinct tokens and returns the same shape as route_text.
+    Every Gemini-routed document is fed back through learn() so the vocabulary
+    grows with what we actually ingest.
+    """
+
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self.docs = 0
+        self.df = {}  # token -> docs containing it
+        self.agent_df = {agent: {} for agent in AGENTS}  # agent -> token -> docs
+        # Routing decisions: local hit, Gemini route_text, or one combined route+extract call
+        self.routed = {"local": 0, "gemini": 0, "combined": 0}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._weights = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.docs = data["docs"]
+                self.df = data["df"]
+                self.agent_df.update(data["agent_df"])
+            except Exception as e:
+                print(f"[Pre-Classifier] Ignoring unreadable model {path}: {e}")
+
+    def _build_weights(self) -> dict:
+        weights = {}
+        for agent, words in SEED_KEYWORDS.items():
+            for w in words:
+                weights.setdefault(w, {})[agent] = SEED_WEIGHT
+        for agent, counts in self.agent_df.items():
+            for token, n in counts.items():
+                df = self.df.get(token, 0)
+                if df >= MIN_DOCS and n / df >= MIN_SHARE:
+                    per_agent = weights.setdefault(token, {})
+                    per_agent[agent] = per_agent.get(agent, 0.0) + n / df
+        return weights
+
+    def classify(self, text: str) -> dict:
+        weights = self._weights
+        if weights is None:
+            weights = self._weights = self._build_weights()
+        scores = dict.fromkeys(AGENTS, 0.0)
+        for token in tokenize(text):
+            for agent, w in weights.get(token, {}).items():
+                scores[agent] += w
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        (best, top), (_, second) = ranked[0], ranked[1]
+        first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+        return {
+            "agent": best,
+            "confidence": round(top / (top + second + PRIOR), 3),
+            "content": first_line[:120],
+        }
+
+    def learn(self, text: str, agent: str):
+        if agent not in self.agent_df:
+            return
+        with self._lock:
+            self.docs += 1
+            counts = self.agent_df[agent]
+            for token in tokenize(text):
+                self.df[token] = self.df.get(token, 0) + 1
+                counts[token] = counts.get(token, 0) + 1
+            self._weights = None
+            self._dirty += 1
+            if self._dirty >= SAVE_EVERY:
+                self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"docs": self.docs, "df": self.df, "agent_df": self.agent_df}, f)
+        os.replace(tmp, self.path)
+        self._dirty = 0
+
+    def save(self):
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def record(self, route: str) -> int:
+        """Count one routing decision ("local", "gemini" or "combined"); returns the new total for it."""
+        with self._lock:
+            self.routed[route] += 1
+            return self.routed[route]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.routed, "trained_docs": self.docs}
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_pre_classifier() -> PreClassifier:
+    """Process-wide classifier, loaded on first use and saved at exit."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = PreClassifier()
+                atexit.register(_classifier.save)
+    return _classifier
@@ -0,0 +1,161 @@
+# app/agents/preprocess.py
+# CPU-bound image/PDF work, run in a process pool so it neither blocks the
+# event loop nor sits behind the GIL. Keep this module's imports light: the
+# pool uses "spawn", so every worker imports it fresh.
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+
+# 0 runs everything inline in the calling thread
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(os.cpu_count() or 2)))
+
+# Upload policy: OCR doesn't need more than ~2k pixels on the long edge
+OCR_MAX_LONG_EDGE = int(os.getenv("OCR_MAX_LONG_EDGE", "2048"))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "0") == "1"
+OCR_CROP = os.getenv("OCR_CROP", "0") == "1"
+
+# Formats Gemini takes directly, for sources that are smaller than their re-encode
+_UPLOAD_MIME = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+def _upload_as_is(img) -> bool:
+    """A single-frame, upright JPEG that's already small enough can be sent untouched."""
+    if img.format != "JPEG" or getattr(img, "n_frames", 1) > 1:
+        return False
+    if img.mode not in ("RGB", "L") or max(img.size) > OCR_MAX_LONG_EDGE:
+        return False
+    if OCR_CROP or (OCR_GRAYSCALE and img.mode != "L"):
+        return False
+    return img.getexif().get(0x0112, 1) == 1  # EXIF orientation
+
+
+def _document_bbox(img):
+    """Bounding box of the bright (paper) region, or None if it isn't clearly smaller than the photo."""
+    from PIL import ImageOps
+
+    small = img.convert("L")
+    small.thumbnail((256, 256))
+    mask = ImageOps.autocontrast(small).point(lambda v: 255 if v > 160 else 0)
+    box = mask.getbbox()
+    if not box:
+        return None
+    area = (box[2] - box[0]) * (box[3] - box[1]) / float(small.size[0] * small.size[1])
+    if not 0.2 <= area <= 0.95:
+        return None
+    sx, sy = img.size[0] / small.size[0], img.size[1] / small.size[1]
+    return (int(box[0] * sx), int(box[1] * sy), int(box[2] * sx), int(box[3] * sy))
+
+
+def _fit(img):
+    if max(img.size) > OCR_MAX_LONG_EDGE:
+        img.thumbnail((OCR_MAX_LONG_EDGE, OCR_MAX_LONG_EDGE), reducing_gap=3.0)
+    return img
+
+
+def encode_image(path: str):
+    """
+    Prepare an image for OCR upload. Returns (bytes, stats), where stats has
+    source_bytes, sent_bytes, mime_type and whether the image was re-encoded.
+    """
+    from PIL import Image, ImageOps
+
+    source_bytes = os.path.getsize(path)
+    with Image.open(path) as img:
+        if _upload_as_is(img):
+            with open(path, "rb") as f:
+                data = f.read()
+            return data, {"source_bytes": source_bytes, "sent_bytes": len(data), "reencoded": False,
+                          "mime_type": "image/jpeg"}
+
+        # Nothing to rotate, crop or shrink: the original bytes are a valid upload too
+        untouched = (
+            img.format in _UPLOAD_MIME and getattr(img, "n_frames", 1) == 1
+            and max(img.size) <= OCR_MAX_LONG_EDGE and img.getexif().get(0x0112, 1) == 1
+        )
+        mime_type = _UPLOAD_MIME.get(img.format)
+        # ✅ Force-clean the image buffer (prevents MPO issue)
+        if hasattr(img, "n_frames") and img.n_frames > 1:
+            img.seek(0)
+        # Let the JPEG decoder scale down while decoding (much faster for big photos)
+        img.draft(None, (OCR_MAX_LONG_EDGE, OCR_MAX_LONG_EDGE))
+        img = ImageOps.exif_transpose(img).convert("L" if OCR_GRAYSCALE else "RGB")
+
+    if OCR_CROP:
+        box = _document_bbox(img)
+        if box:
+            img = img.crop(box)
+            untouched = False
+    img = _fit(img)
+
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+    data = buffer.getvalue()
+    if untouched and len(data) >= source_bytes:
+        # Flat screenshots and diagrams are often smaller as PNG than as JPEG
+        with open(path, "rb") as f:
+            data = f.read()
+        return data, {"source_bytes": source_bytes, "sent_bytes": len(data), "reencoded": False,
+                      "mime_type": mime_type}
+    return data, {"source_bytes": source_bytes, "sent_bytes": len(data), "reencoded": True,
+                  "mime_type": "image/jpeg"}
+
+
+def rasterize_pages(path: str, first: int, last: int) -> list:
+    """Rasterize PDF pages first..last and return them as JPEG bytes, one per page."""
+    from pdf2image import convert_from_path
+
+    pages = []
+    for page in convert_from_path(path, first_page=first, last_page=last):
+        page = _fit(page.convert("L") if OCR_GRAYSCALE else page)
+        buf = BytesIO()
+        page.save(buf, format="JPEG", quality=OCR_JPEG_QUALITY)
+        pages.append(buf.getvalue())
+    return pages
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The shared worker pool, or None when preprocessing runs inline."""
+    global _pool, PREPROCESS_WORKERS
+    if _pool is None and PREPROCESS_WORKERS > 0:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ProcessPoolExecutor(
+                        max_workers=PREPROCESS_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except (OSError, NotImplementedError) as e:
+                    print(f"[Preprocess] No process pool ({e}), running inline")
+                    PREPROCESS_WORKERS = 0
+    return _pool
+
+
+def submit(fn, *args) -> Future:
+    """Start fn(*args) in the pool; returns a Future either way."""
+    pool = get_pool()
+    if pool is not None:
+        return pool.submit(fn, *args)
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def run(fn, *args):
+    """Blocking helper for sync callers (already off the UI loop)."""
+    return submit(fn, *args).result()
+
+
+async def arun(fn, *args):
+    """Await fn(*args) from the event loop without blocking it."""
+    return await asyncio.wrap_future(submit(fn, *args))
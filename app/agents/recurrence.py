@@ -0,0 +1,340 @@
+# app/agents/recurrence.py
+# Recurring tasks/events are stored as rules and only expanded for the window
+# being asked about. Rules live in an interval index so a window query touches
+# only the rules that can have an occurrence in it, and each of those jumps
+# straight to its first occurrence in the window instead of walking from the start.
+import bisect
+import calendar
+import heapq
+import json
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+
+# Rules per index block; blocks split at twice this size
+INDEX_BLOCK = int(os.getenv("RECURRENCE_INDEX_BLOCK", "64"))
+
+FOREVER = datetime.max
+
+_FREQUENCIES = {
+    "daily": ("days", 1), "day": ("days", 1),
+    "weekly": ("days", 7), "week": ("days", 7),
+    "biweekly": ("days", 14), "fortnightly": ("days", 14),
+    "monthly": ("months", 1), "month": ("months", 1),
+    "quarterly": ("months", 3),
+    "yearly": ("months", 12), "annually": ("months", 12), "annual": ("months", 12), "year": ("months", 12),
+}
+
+
+def parse_when(day, clock=None):
+    """Best-effort datetime from the model's date / time strings, or None."""
+    if not day:
+        return None
+    try:
+        when = datetime.fromisoformat(str(day).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is not None:
+        # Everything else here is naive local wall-clock time (the agenda starts at
+        # date.today()), so convert "…Z" / "…+02:00" into it rather than dropping the offset
+        when = when.astimezone().replace(tzinfo=None)
+    if clock and when.time() == time():
+        for fmt in ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I %p", "%I:%M%p", "%I%p"):
+            try:
+                t = datetime.strptime(str(clock).strip().upper(), fmt).time()
+            except ValueError:
+                continue
+            return datetime.combine(when.date(), t)
+    return when
+
+
+def _add_months(when: datetime, months: int) -> datetime:
+    y, m = divmod(when.month - 1 + months, 12)
+    year, month = when.year + y, m + 1
+    if year > 9999:
+        return FOREVER
+    return when.replace(year=year, month=month, day=min(when.day, calendar.monthrange(year, month)[1]))
+
+
+class Rule:
+    """
+    One recurring (or one-off) item: first start, step, optional last start and
+    the length of each occurrence. Occurrence k is always computed from the
+    first start, so monthly rules on the 31st don't drift.
+    """
+
+    __slots__ = ("start", "unit", "step", "until", "duration", "payload")
+
+    def __init__(self, start, unit=None, step=0, until=None, duration=timedelta(0), payload=None):
+        self.start = start
+        self.unit = unit  # "days", "months", or None for a single occurrence
+        self.step = step
+        self.until = start if unit is None else (until or FOREVER)
+        self.duration = duration
+        self.payload = payload
+
+    @property
+    def end(self) -> datetime:
+        """Latest moment any occurrence can still be running."""
+        return FOREVER if self.until == FOREVER else self.until + self.duration
+
+    def nth(self, k: int) -> datetime:
+        if k == 0 or self.unit is None:
+            return self.start
+        if self.unit == "days":
+            try:
+                return self.start + timedelta(days=k * self.step)
+            except OverflowError:
+                return FOREVER
+        return _add_months(self.start, k * self.step)
+
+    def _first_index(self, after: datetime) -> int:
+        """Smallest k whose occurrence is still running at `after` (arithmetic, no walking)."""
+        earliest = after - self.duration
+        if earliest <= self.start or self.unit is None:
+            return 0
+        if self.unit == "days":
+            step = timedelta(days=self.step)
+            return -((self.start - earliest) // step)  # ceil division
+        # Occurrence k falls in month start + k*step, so only the month of
+        # `earliest` itself can go either way
+        months = (earliest.year - self.start.year) * 12 + earliest.month - self.start.month
+        k = months // self.step
+        return k + 1 if self.nth(k) < earliest else k
+
+    def between(self, start: datetime, end: datetime):
+        """Yield (occurrence_start, occurrence_end) overlapping [start, end), lazily."""
+        k = self._first_index(start)
+        while True:
+            when = self.nth(k)
+            if when >= end or when > self.until or when == FOREVER:
+                return
+            if when + self.duration > start or when >= start:
+                yield when, when + self.duration
+            if self.unit is None:
+                return
+            k += 1
+
+
+def rule_from_item(item: dict):
+    """Build a Rule from a task (due_date/time_start) or event (start/end) dict, or None."""
+    if not isinstance(item, dict):
+        return None
+    start = parse_when(item.get("start") or item.get("due_date"), item.get("time_start"))
+    if start is None:
+        return None
+    end = parse_when(item.get("end"))
+    duration = end - start if end and end > start else timedelta(0)
+
+    recurring = item.get("recurring") or {}
+    unit, step = _FREQUENCIES.get(str(recurring.get("frequency") or "").strip().lower(), (None, 0))
+    if unit:
+        try:
+            step *= max(1, int(recurring.get("interval") or 1))
+        except (TypeError, ValueError):
+            pass
+    until = parse_when(recurring.get("end_date")) if unit else None
+    if until is not None and until.time() == time():
+        until = datetime.combine(until.date(), time.max)  # an end date includes that whole day
+    return Rule(start, unit, step, until, duration, item)
+
+
+class _Block:
+    __slots__ = ("entries", "max_end")
+
+    def __init__(self, entries):
+        self.entries = entries  # sorted [(start, key)]
+        self.max_end = None
+
+
+class RecurrenceIndex:
+    """
+    Interval index over rules' [first start, last end] spans: rules sorted by
+    first start, cut into blocks that remember their latest end. A window query
+    stops at the first block that starts after the window and skips blocks
+    that all end before it. add/update/remove only touch one block.
+    """
+
+    def __init__(self, block_size=INDEX_BLOCK):
+        self.block_size = block_size
+        self.rules = {}
+        self.docs = {}  # doc_id -> its keys, so a re-indexed document drops its old rules
+        self._blocks = []
+        self._firsts = []  # first start of each block, for bisect
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _refresh(self, i):
+        block = self._blocks[i]
+        self._firsts[i] = block.entries[0][0]
+        block.max_end = max(self.rules[key].end for _, key in block.entries)
+
+    def _insert(self, key, rule):
+        entry = (rule.start, key)
+        if not self._blocks:
+            self._blocks.append(_Block([entry]))
+            self._firsts.append(rule.start)
+            self._refresh(0)
+            return
+        i = max(0, bisect.bisect_right(self._firsts, rule.start) - 1)
+        block = self._blocks[i]
+        bisect.insort(block.entries, entry)
+        if len(block.entries) > 2 * self.block_size:
+            half = len(block.entries) // 2
+            self._blocks.insert(i + 1, _Block(block.entries[half:]))
+            self._firsts.insert(i + 1, None)
+            del block.entries[half:]
+            self._refresh(i + 1)
+            self._refresh(i)
+        else:
+            self._firsts[i] = block.entries[0][0]
+            block.max_end = max(block.max_end, rule.end)
+
+    def _delete(self, key, rule):
+        entry = (rule.start, key)
+        i = max(0, bisect.bisect_left(self._firsts, rule.start) - 1)
+        # Equal starts can straddle a block boundary
+        while i < len(self._blocks) and entry not in self._blocks[i].entries:
+            i += 1
+        block = self._blocks[i]
+        block.entries.remove(entry)
+        if block.entries:
+            self._refresh(i)
+        else:
+            del self._blocks[i], self._firsts[i]
+
+    def add(self, key, rule: Rule):
+        """Insert or replace the rule stored under `key`."""
+        with self._lock:
+            old = self.rules.get(key)
+            if old is not None:
+                self._delete(key, old)
+            self.rules[key] = rule
+            self._insert(key, rule)
+
+    update = add
+
+    def remove(self, key):
+        with self._lock:
+            rule = self.rules.pop(key, None)
+            if rule is not None:
+                self._delete(key, rule)
+
+    def set_document(self, doc_id, rules: dict):
+        """Replace every rule indexed for doc_id with `rules` ({key: rule})."""
+        with self._lock:
+            for key in self.docs.pop(doc_id, ()):
+                rule = self.rules.pop(key, None)
+                if rule is not None:
+                    self._delete(key, rule)
+            for key, rule in rules.items():
+                old = self.rules.get(key)
+                if old is not None:
+                    self._delete(key, old)
+                self.rules[key] = rule
+                self._insert(key, rule)
+            if rules:
+                self.docs[doc_id] = list(rules)
+
+    def remove_document(self, doc_id):
+        self.set_document(doc_id, {})
+
+    def candidates(self, start: datetime, end: datetime) -> list:
+        """Keys of rules whose span overlaps [start, end)."""
+        found = []
+        with self._lock:
+            stop = bisect.bisect_left(self._firsts, end)
+            for block in self._blocks[:stop]:
+                if block.max_end < start:
+                    continue
+                for first, key in block.entries:
+                    if first >= end:
+                        break
+                    if self.rules[key].end >= start:
+                        found.append(key)
+            return [(key, self.rules[key]) for key in found]
+
+    def between(self, start: datetime, end: datetime, limit: int = None) -> list:
+        """
+        Occurrences overlapping [start, end) in time order, as dicts with
+        key, start, end and the original item. Only the next occurrence of
+        each rule is ever materialised ahead of the one being returned.
+        """
+        heap = []
+        for key, rule in self.candidates(start, end):
+            k = rule._first_index(start)
+            when = rule.nth(k)
+            if when < start and when + rule.duration <= start:
+                # Ends exactly where the window begins
+                if not rule.unit:
+                    continue
+                k, when = k + 1, rule.nth(k + 1)
+            if when < end and when <= rule.until:
+                heap.append((when, key, k, rule))
+        heapq.heapify(heap)
+
+        found = []
+        while heap and (limit is None or len(found) < limit):
+            when, key, k, rule = heap[0]
+            found.append({"key": key, "start": when, "end": when + rule.duration, "item": rule.payload})
+            following = rule.nth(k + 1) if rule.unit else FOREVER
+            if following < end and following <= rule.until:
+                heapq.heapreplace(heap, (following, key, k + 1, rule))
+            else:
+                heapq.heappop(heap)
+        return found
+
+    def agenda(self, days: int = 7, today: date = None, limit: int = None) -> list:
+        """What's on from the start of `today` for the next `days` days."""
+        first = datetime.combine(today or date.today(), time())
+        return self.between(first, first + timedelta(days=days), limit)
+
+
+def index_items(index: RecurrenceIndex, doc_id, items) -> int:
+    """(Re)index a document's dated items under keys doc_id:0, doc_id:1, ...; returns how many were indexed."""
+    rules = {}
+    for i, item in enumerate(items):
+        rule = rule_from_item(item)
+        if rule is not None:
+            rules[f"{doc_id}:{i}"] = rule
+    index.set_document(doc_id, rules)
+    return len(rules)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_document(doc_id, items):
+    """Keep an already-built index current after a store insert (a fresh one reads the store anyway)."""
+    if _index is not None:
+        index_items(_index, doc_id, items)
+
+
+def _drop_documents(doc_ids):
+    """Store listener: these documents were replaced (same content hash), so their rules go."""
+    if _index is not None:
+        for doc_id in doc_ids:
+            _index.remove_document(doc_id)
+
+
+def get_index() -> RecurrenceIndex:
+    """Process-wide index, built from the document store's tasks and events on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from app.utils.store import get_store
+                store = get_store()
+                store.on_replace(_drop_documents)
+                rows = sorted(store.tasks(limit=-1) + store.events(limit=-1), key=lambda row: row["id"])
+                by_doc = {}
+                for row in rows:
+                    by_doc.setdefault(row["doc_id"], []).append(json.loads(row["data"]))
+                index = RecurrenceIndex()
+                for doc_id, items in by_doc.items():
+                    index_items(index, doc_id, items)
+                _index = index
+    return _index
@@ -1,13 +1,17 @@
 # app/agents/router_agent.py
 import os
 import json
-import google.generativeai as genai
-from app.agents.ocr_agent import extract_text  # ✅ directly reuse OCR
+from app.agents.ocr_agent import DATA_DIR, load_genai
+from app.agents.pre_classifier import get_pre_classifier
+from app.agents.chunking import sample_text
+from app.agents.schemas import (
+    AGENTS, EXTRACTIONS, ROUTE_EXTRACT_SCHEMA, list_schema, validate_extraction,
+)
+from app.utils.metrics import inc, span
+from app.utils.scheduler import estimate_tokens, get_scheduler
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-DATA_DIR = r"C:\Users\nehah\GeminiDesk\GeminiDesk\data"
+# Local routes at or above this confidence skip the Gemini call entirely
+ROUTER_LOCAL_THRESHOLD = float(os.getenv("ROUTER_LOCAL_THRESHOLD", "0.75"))
 
 SYSTEM_PROMPT = """
 You are a document classifier. Analyze the following text and decide the best agent:
@@ -20,36 +24,117 @@ Return JSON only in this format:
 {"agent": "<AgentName>", "confidence": <float>, "content": "<short description>"}
 """
 
+COMBINED_PROMPT = SYSTEM_PROMPT + """
+Also fill in the details for the agent you chose, in the matching field of the schema:
+task (TaskAgent), event (EventAgent), receipt (FinanceAgent) or note (NoteAgent).
+Leave the other fields out.
+"""
+
+_models = {}
+
+
+def _json_model(schema=None):
+    """JSON-mode model for `schema`, built once per distinct schema and then reused."""
+    key = json.dumps(schema, sort_keys=True)
+    model = _models.get(key)
+    if model is None:
+        config = {"temperature": 0.2, "response_mime_type": "application/json"}
+        if schema is not None:
+            config["response_schema"] = schema
+        model = _models[key] = load_genai().GenerativeModel("models/gemini-2.5-flash", generation_config=config)
+    return model
+
+
+def _generate(schema, prompt: str):
+    """generate_content through the shared Gemini scheduler."""
+    model = _json_model(schema)
+    return get_scheduler().call(model.generate_content, prompt, tokens=estimate_tokens(prompt))
+
+
 def route_text(text: str) -> dict:
-    """Send text to Gemini and return structured JSON classification."""
-    model = genai.GenerativeModel(
-        "models/gemini-2.5-flash",
-        generation_config={
-            "temperature": 0.2,
-            "response_mime_type": "application/json"
-        }
+    """Classify text locally when obvious, otherwise ask Gemini for structured JSON."""
+    classifier = get_pre_classifier()
+    local = classifier.classify(text)
+    if local["confidence"] >= ROUTER_LOCAL_THRESHOLD:
+        avoided = classifier.record("local")
+        inc("route.local")
+        print(f"[Router Agent] Local route -> {local['agent']} ({local['confidence']}), "
+              f"{avoided} Gemini calls avoided")
+        return local
+
+    with span("route.gemini"):
+        response = _generate(None, SYSTEM_PROMPT + "\n\nText:\n" + sample_text(text))
+        result = json.loads(response.text.strip())
+    inc("route.gemini")
+    classifier.record("gemini")
+    classifier.learn(text, result.get("agent"))
+    return result
+
+
+def route_and_extract(text: str):
+    """
+    Route and extract in a single structured-output call.
+    Returns {"agent", "confidence", "content", "extraction"}, or None when the
+    response doesn't validate so the caller can fall back to route_text + a parser.
+    """
+    with span("route.combined"):
+        response = _generate(ROUTE_EXTRACT_SCHEMA, COMBINED_PROMPT + "\n\nText:\n" + text)
+    try:
+        result = json.loads(response.text.strip())
+    except json.JSONDecodeError:
+        print("[Router Agent] Combined response was not JSON, falling back")
+        inc("route.combined.fallbacks")
+        return None
+
+    # Valid JSON isn't necessarily an object with every field we read below
+    if not isinstance(result, dict):
+        result = {}
+    agent = result.get("agent")
+    field = EXTRACTIONS.get(agent, (None,))[0]
+    valid = (
+        agent in AGENTS
+        and isinstance(result.get("confidence"), (int, float))
+        and isinstance(result.get("content"), str)
+        and validate_extraction(agent, result.get(field))
     )
-    response = model.generate_content(SYSTEM_PROMPT + "\n\nText:\n" + text[:4000])
+    if not valid:
+        print(f"[Router Agent] Combined response for {agent} failed validation, falling back")
+        inc("route.combined.fallbacks")
+        return None
+
+    inc("route.combined")
+    classifier = get_pre_classifier()
+    classifier.record("combined")
+    classifier.learn(text, agent)
+    return {
+        "agent": agent,
+        "confidence": result["confidence"],
+        "content": result["content"],
+        "extraction": result[field],
+    }
+
+
+def extract_fields(agent: str, text: str) -> dict:
+    """Second step of the two-call path: extract the agent's schema from text."""
+    field, schema, _ = EXTRACTIONS[agent]
+    prompt = f"Extract the key {field} details as JSON per this schema.\nTEXT:\n{text}"
+    response = _generate(schema, prompt)
     return json.loads(response.text.strip())
 
+
+def extract_many(agent: str, text: str) -> list:
+    """Like extract_fields, but returns every item found (used per chunk of long text)."""
+    field, schema, _ = EXTRACTIONS[agent]
+    prompt = f"Extract every {field} as JSON per this schema.\nTEXT:\n{text}"
+    response = _generate(list_schema(schema), prompt)
+    return json.loads(response.text.strip()).get("items", [])
+
+
 if __name__ == "__main__":
+    import asyncio
+    from app.agents.ingest import IngestService
+
+    # Only new or changed files get extracted and routed; see app/agents/ingest.py
     print(f"\n📂 Scanning all files in: {DATA_DIR}")
-    for file in os.listdir(DATA_DIR):
-        fpath = os.path.join(DATA_DIR, file)
-        if not os.path.isfile(fpath):
-            continue
-
-        print(f"\n🔍 Processing and routing: {file}")
-        try:
-            # 1️⃣ Extract text first (works for both images & text files)
-            text = extract_text(fpath)
-            if not text.strip():
-                print(f"[Router Agent] ⚠️ No text extracted from {file}, skipping.")
-                continue
-
-            # 2️⃣ Route text to correct agent
-            result = route_text(text)
-            print(json.dumps(result, indent=2))
-
-        except Exception as e:
-            print(f"[Router Agent] ❌ Failed on {file}: {e}")
+    print(f"[Router Agent] {asyncio.run(IngestService(DATA_DIR).run_once())}")
+    print(f"\n[Router Agent] Routing stats: {get_pre_classifier().stats()}")
@@ -0,0 +1,112 @@
+# app/agents/schemas.py
+# Gemini responseSchema definitions shared by the agents and the combined router.
+
+AGENTS = ["NoteAgent", "FinanceAgent", "TaskAgent", "EventAgent"]
+
+RECURRING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "frequency": {"type": "string", "description": "daily, weekly, monthly, etc."},
+        "interval": {"type": "integer", "description": "how often, e.g. every 2 weeks"},
+        "end_date": {"type": "string", "description": "optional end date"}
+    }
+}
+
+TASK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "due_date": {"type": "string"},
+        "time_start": {"type": "string"},
+        "time_estimate": {"type": "string"},
+        "difficulty": {"type": "string"},
+        "category": {"type": "string"},
+        "location": {"type": "string"},
+        "recurring": RECURRING_SCHEMA
+    }
+}
+
+EVENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "start": {"type": "string", "description": "ISO 8601 date or datetime"},
+        "end": {"type": "string", "description": "ISO 8601 date or datetime"},
+        "location": {"type": "string"},
+        "description": {"type": "string"},
+        "recurring": RECURRING_SCHEMA
+    }
+}
+
+RECEIPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "merchant": {"type": "string"},
+        "date": {"type": "string"},
+        "total": {"type": "number"},
+        "currency": {"type": "string"},
+        "category": {"type": "string", "description": "Travel, Meals, Groceries, Misc, etc."},
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "price": {"type": "number"},
+                    "quantity": {"type": "number"}
+                }
+            }
+        }
+    }
+}
+
+NOTE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "summary": {"type": "string"},
+        "key_points": {"type": "array", "items": {"type": "string"}},
+        "tags": {"type": "array", "items": {"type": "string"}}
+    }
+}
+
+# Agent -> (field in the combined response, schema, fields that must be filled in)
+EXTRACTIONS = {
+    "TaskAgent": ("task", TASK_SCHEMA, ["title"]),
+    "EventAgent": ("event", EVENT_SCHEMA, ["title", "start"]),
+    "FinanceAgent": ("receipt", RECEIPT_SCHEMA, ["total"]),
+    "NoteAgent": ("note", NOTE_SCHEMA, ["summary"]),
+}
+
+# Fields that identify the same item when it shows up in more than one chunk
+DEDUP_KEYS = {
+    "TaskAgent": ("title", "due_date"),
+    "EventAgent": ("title", "start"),
+    "FinanceAgent": ("merchant", "date", "total"),
+    "NoteAgent": ("title",),
+}
+
+
+def list_schema(schema: dict) -> dict:
+    """Wrap an item schema so one call can return every item found in a chunk."""
+    return {"type": "object", "properties": {"items": {"type": "array", "items": schema}}}
+
+
+ROUTE_EXTRACT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "agent": {"type": "string", "enum": AGENTS},
+        "confidence": {"type": "number"},
+        "content": {"type": "string"},
+        **{field: schema for field, schema, _ in EXTRACTIONS.values()}
+    },
+    "required": ["agent", "confidence", "content"]
+}
+
+
+def validate_extraction(agent: str, data) -> bool:
+    """True if `data` is a usable extraction for `agent` (required fields present)."""
+    if agent not in EXTRACTIONS or not isinstance(data, dict):
+        return False
+    _, _, required = EXTRACTIONS[agent]
+    return all(data.get(key) not in (None, "", []) for key in required)
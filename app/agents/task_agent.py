@@ -1,68 +1,236 @@
-import os, json, httpx
+import os, json, copy, asyncio, httpx
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from app.agents.chunking import CHUNK_CHARS, merge_chunks, split_text
+from app.agents.schemas import DEDUP_KEYS, TASK_SCHEMA, list_schema
+from app.utils.cache import make_key
+from app.utils.log_hub import hub, router as logs_router
+from app.utils.metrics import inc, record_usage, registry, span
+from app.utils.scheduler import RETRYABLE_STATUSES, RetryableError, estimate_tokens, get_scheduler
+from app.utils.store import get_store
+from app.utils.uploads import router as uploads_router
+
 
 load_dotenv()
 
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-
-
-app = FastAPI()
+# Point at a stand-in server (e.g. python -m benchmarks.mock_gemini) instead of the live API
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip("/")
+GEMINI_URL = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+
+
+# Upstream connection pool, shared by every request for the life of the app
+HTTP_MAX_CONNECTIONS = int(os.getenv("GEMINI_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("GEMINI_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GEMINI_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2 = os.getenv("GEMINI_HTTP2", "0") == "1"
+
+# /parse/batch fan-out limits
+BATCH_CONCURRENCY = int(os.getenv("PARSE_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("PARSE_BATCH_MAX_ITEMS", "1000"))
+
+_client = None
+_inflight = {}  # normalized text -> task for the upstream call already running
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        http2 = HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("[Task Agent] GEMINI_HTTP2=1 but h2 isn't installed, using HTTP/1.1")
+                http2 = False
+        _client = httpx.AsyncClient(
+            timeout=30,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_client()
+    yield
+    if _client is not None:
+        await _client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(logs_router)
+app.include_router(uploads_router)
 
 
 class ParseRequest(BaseModel):
     text: str
+    # Keep the text and result in the document store (search, agenda, budget)
+    store: bool = False
 
 
-@app.post("/parse")
-async def parse(req: ParseRequest):
-    if not GEMINI_API_KEY:
-        raise HTTPException(500, detail="Missing GEMINI_API_KEY")
+class BatchParseRequest(BaseModel):
+    texts: List[str]
+    concurrency: Optional[int] = None
 
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "title": {"type": "string"},
-            "due_date": {"type": "string"},
-            "time_start": {"type": "string"},
-            "time_estimate": {"type": "string"},
-            "difficulty": {"type": "string"},
-            "category": {"type": "string"},
-            "location": {"type": "string"},
-            "recurring": {
-                "type": "object",
-                "properties": {
-                    "frequency": {"type": "string", "description": "daily, weekly, monthly, etc."},
-                    "interval": {"type": "integer", "description": "how often, e.g. every 2 weeks"},
-                    "end_date": {"type": "string", "description": "optional end date"}
-                }
-            }
-        }
-    }
+TASK_LIST_SCHEMA = list_schema(TASK_SCHEMA)
+
+
+async def extract_task(text: str) -> dict:
+    """
+    Run the task-extraction prompt over `text` and return the parsed JSON.
+    Text longer than CHUNK_CHARS is split and extracted chunk by chunk in parallel;
+    the result is then {"items": [task, ...], "chunks": n} instead of a single task.
+    """
+    if len(text) > CHUNK_CHARS:
+        return await extract_tasks_chunked(text)
+    return await _coalesced(text, TASK_SCHEMA)
+
+
+async def extract_tasks_chunked(text: str) -> dict:
+    chunks = split_text(text)
+    results = await asyncio.gather(
+        *(_coalesced(chunk, TASK_LIST_SCHEMA) for chunk in chunks), return_exceptions=True
+    )
+    return merge_chunks(
+        [res if isinstance(res, BaseException) else res.get("items", []) for res in results],
+        DEDUP_KEYS["TaskAgent"],
+    )
 
 
-    prompt = f"Extract key task details as JSON per this schema.\nTEXT:\n{req.text}"
+async def _coalesced(text: str, schema: dict) -> dict:
+    # Concurrent calls with the same text (ignoring whitespace) share one upstream request
+    key = (" ".join(text.split()), id(schema))
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_extract(text, schema))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one caller disconnecting mustn't cancel the call the others are waiting on
+    return copy.deepcopy(await asyncio.shield(task))
+
+
+async def _post(payload: dict) -> httpx.Response:
+    r = await get_client().post(GEMINI_URL, json=payload)
+    if r.status_code in RETRYABLE_STATUSES:
+        retry_after = r.headers.get("retry-after")
+        raise RetryableError(
+            r.status_code, r.text, float(retry_after) if retry_after and retry_after.isdigit() else None
+        )
+    return r
+
+
+async def _extract(text: str, schema: dict) -> dict:
+    if not GEMINI_API_KEY:
+        raise HTTPException(500, detail="Missing GEMINI_API_KEY")
+
+
+    what = "every task" if schema is TASK_LIST_SCHEMA else "key task details"
+    prompt = f"Extract {what} as JSON per this schema.\nTEXT:\n{text}"
     payload = {
         "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         "generationConfig": {"responseMimeType": "application/json", "responseSchema": schema}
     }
 
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(GEMINI_URL, json=payload)
-        if r.status_code != 200:
-            raise HTTPException(500, detail=f"Gemini error: {r.text}")
-        data = r.json()
+    r = await get_scheduler().acall(_post, payload, tokens=estimate_tokens(prompt))
+    if r.status_code != 200:
+        raise HTTPException(500, detail=f"Gemini error: {r.text}")
+    data = r.json()
+    record_usage(data)
 
 
     try:
         raw = data["candidates"][0]["content"]["parts"][0]["text"]
         return json.loads(raw)
     except Exception as e:
-        raise HTTPException(500, detail=f"Parse error: {e}\n{data}")
\ No newline at end of file
+        raise HTTPException(500, detail=f"Parse error: {e}\n{data}")
+
+
+@app.post("/parse")
+async def parse(req: ParseRequest):
+    store = get_store()
+    digest = make_key("parse", req.text)
+    with span("api.parse"):
+        stored = await asyncio.to_thread(store.get_by_hash, digest)
+        if stored and stored["parsed"] is not None:
+            result = stored["parsed"]
+            inc("api.parse.stored")
+        else:
+            result = await extract_task(req.text)
+            if req.store:
+                await asyncio.to_thread(
+                    store.add_document, "parse", req.text, None, digest, {"agent": "TaskAgent"}, result
+                )
+    # The model can answer with a list or a scalar; that's still a result, not a 500
+    title = result.get("title") if isinstance(result, dict) else None
+    hub.publish({"stage": "parse", "chars": len(req.text), "title": title})
+    return result
+
+
+@app.post("/parse/batch")
+async def parse_batch(req: BatchParseRequest):
+    """
+    Parse many texts at once. Streams NDJSON in completion order, one line per input:
+    {"index": i, "result": {...}} or {"index": i, "error": "..."}.
+    """
+    if len(req.texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(413, detail=f"Too many texts (max {BATCH_MAX_ITEMS})")
+    limit = max(1, min(req.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+
+    async def lines():
+        sem = asyncio.Semaphore(limit)
+
+        async def one(i, text):
+            async with sem:
+                try:
+                    item = {"index": i, "result": await extract_task(text)}
+                except HTTPException as e:
+                    item = {"index": i, "error": e.detail}
+                except Exception as e:
+                    item = {"index": i, "error": str(e)}
+                hub.publish({"stage": "parse_batch", "index": i, "ok": "result" in item})
+                return item
+
+        tasks = [asyncio.ensure_future(one(i, text)) for i, text in enumerate(req.texts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Client went away: stop the items that haven't run yet
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics")
+async def metrics(format: str = "json", spans: int = 0):
+    """Counters, span histograms and cache/scheduler stats; ?format=prometheus for scrapers."""
+    if format == "prometheus":
+        return PlainTextResponse(registry.prometheus())
+    return registry.snapshot(spans)
+
+
+@app.post("/process")
+async def process(payload: dict):
+    """Receive a console submission (prompt + per-file pipeline results)."""
+    files = payload.get("files", [])
+    for f in files:
+        route = (f.get("result") or {}).get("route") or {}
+        upload = f.get("upload") or {}
+        hub.publish({"stage": "process", "file": f.get("name"), "agent": route.get("agent"), "sha256": upload.get("sha256")})
+    return {"ok": True, "files": len(files)}
@@ -1,9 +1,28 @@
-import asyncio, json, flet as ft, plotly.graph_objects as go
+import asyncio, json, os, flet as ft
+from collections import deque
+from itertools import islice
 from app.styles import Colors, Spacing
-from app.utils.api import APIClient
-from flet.plotly_chart import PlotlyChart
+from app.agents.recurrence import get_index
+from app.utils.budget import get_budget
+from app.utils.metrics import span
+from app.utils.store import get_store
 # import flet_webview as ftwv
 
+# Logs tab: at most one UI update per frame, a bounded history, and a bounded number of controls
+LOG_FRAME_INTERVAL = float(os.getenv("LOG_FRAME_INTERVAL", "0.05"))
+LOG_MAX_BATCH = int(os.getenv("LOG_MAX_BATCH", "1000"))
+LOG_RETAIN = int(os.getenv("LOG_RETAIN", "5000"))
+LOG_VISIBLE = int(os.getenv("LOG_VISIBLE", "200"))
+# Notes search: wait for typing to pause, then show this many hits
+SEARCH_DEBOUNCE = float(os.getenv("SEARCH_DEBOUNCE", "0.15"))
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "20"))
+# Budget tab: "native" updates pie sections in place; "plotly" rebuilds a figure (needs plotly)
+BUDGET_CHART = os.getenv("BUDGET_CHART", "native")
+BUDGET_PALETTE = ["#38bdf8", "#f472b6", "#34d399", "#fbbf24", "#a78bfa", "#f87171", "#60a5fa", "#4ade80"]
+# Tasks tab: what's on over the next N days
+AGENDA_DAYS = int(os.getenv("AGENDA_DAYS", "7"))
+AGENDA_LIMIT = int(os.getenv("AGENDA_LIMIT", "200"))
+
 class AgentTabs:
     def __init__(self, page, logs_queue, router_signal):
         self.page = page
@@ -11,34 +30,212 @@ class AgentTabs:
         self.router_signal = router_signal
 
         self.notes_md = ft.Markdown(value="", extension_set=ft.MarkdownExtensionSet.GITHUB_WEB)
+        self.search_field = ft.TextField(
+            hint_text="Search documents…", prefix_icon=ft.Icons.SEARCH, dense=True, on_change=self._search,
+        )
+        self.search_results = ft.Column(spacing=2)
+        self.search_seq = 0
+        self.notes_view = ft.Column(
+            [self.search_field, self.search_results, self.notes_md], expand=True, scroll=ft.ScrollMode.AUTO,
+        )
         self.tasks = ft.ListView(auto_scroll=True, expand=True)
-        self.budget_chart = PlotlyChart(self._pie({"Travel":3, "Meals":2, "Misc":1}), expand=True)
-        self.logs = ft.ListView(expand=True, spacing=4, auto_scroll=True)
+        self.budget_chart = ft.PieChart(sections=[], sections_space=2, center_space_radius=40, height=250)
+        self.budget_sections = {}
+        self.budget_summary = ft.Text("No receipts yet", size=12, color=Colors.MUTED)
+        self.budget_view = ft.Column([self.budget_chart, self.budget_summary], expand=True)
+        self.logs = ft.ListView(expand=True, spacing=4, auto_scroll=True, first_item_prototype=True)
+        self.log_lines = deque(maxlen=LOG_RETAIN)
+        self.log_offset = 0  # how many lines back from the newest the view is scrolled
+        self.log_status = ft.Text("", size=11, color=Colors.MUTED)
+        self.logs_view = ft.Column([
+            ft.Row([
+                ft.IconButton(ft.Icons.ARROW_UPWARD, tooltip="Older", on_click=lambda e: self._page_logs(LOG_VISIBLE)),
+                ft.IconButton(ft.Icons.ARROW_DOWNWARD, tooltip="Newer", on_click=lambda e: self._page_logs(-LOG_VISIBLE)),
+                ft.IconButton(ft.Icons.VERTICAL_ALIGN_BOTTOM, tooltip="Latest", on_click=lambda e: self._page_logs(None)),
+                self.log_status,
+            ]),
+            self.logs,
+        ], expand=True)
         # self.diagram_frame = ft.Html(content="", height=400, border_radius=12)
 
-        self.tabs = ft.Tabs(scrollable=True, expand=True, tabs=[
-            ft.Tab(text="Notes", icon=ft.Icons.NOTE, content=self.notes_md),
-            ft.Tab(text="Tasks", icon=ft.Icons.CHECKLIST, content=self.tasks),
-            ft.Tab(text="Budget", icon=ft.Icons.SAVINGS, content=self.budget_chart),
-            ft.Tab(text="Logs", icon=ft.Icons.TERMINAL, content=self.logs),
+        # Only the Notes tab goes out with the first frame; the others are attached
+        # the first time they're selected (until then their updates are skipped)
+        self.tab_views = [self.notes_view, self.tasks, self.budget_view, self.logs_view]
+        self.tabs = ft.Tabs(scrollable=True, expand=True, on_change=self._on_tab_change, tabs=[
+            ft.Tab(text="Notes", icon=ft.Icons.NOTE, content=self.notes_view),
+            ft.Tab(text="Tasks", icon=ft.Icons.CHECKLIST),
+            ft.Tab(text="Budget", icon=ft.Icons.SAVINGS),
+            ft.Tab(text="Logs", icon=ft.Icons.TERMINAL),
             # ft.Tab(text="Diagram", icon=ft.Icons.HUB, content=self.diagram_frame),
         ])
 
         self.view = ft.Container(self.tabs, bgcolor=Colors.SURFACE, padding=Spacing.MD, border_radius=12)
 
         asyncio.create_task(self._consume_logs())
+        asyncio.create_task(self.refresh_agenda())
+        asyncio.create_task(self._bind_budget())
+
+    def _on_tab_change(self, e):
+        tab = self.tabs.tabs[self.tabs.selected_index]
+        if tab.content is not None:
+            return
+        tab.content = self.tab_views[self.tabs.selected_index]
+        if tab.content is self.logs_view:
+            # Lines that arrived while the tab was hidden only went into log_lines
+            self.log_offset = 0
+            self.logs.controls = [ft.Text(line) for line in islice(
+                self.log_lines, max(0, len(self.log_lines) - LOG_VISIBLE), len(self.log_lines))]
+            self._update_log_status()
+        self.tabs.update()
 
     async def _consume_logs(self):
         while True:
-            msg = await self.logs_queue.get()
-            try:
-                data = json.loads(msg)
-            except Exception:
-                data = {"message": msg}
-            self.logs.controls.append(ft.Text(json.dumps(data)))
-            self.logs.update()
-
-    def _pie(self, data):
-        fig = go.Figure(data=[go.Pie(labels=list(data.keys()), values=list(data.values()))])
+            # Take everything that's queued up, render it as one diff, then let the
+            # next frame's worth of messages pile up
+            batch = [await self.logs_queue.get()]
+            while len(batch) < LOG_MAX_BATCH:
+                try:
+                    batch.append(self.logs_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            lines = [self._format_log(msg) for msg in batch]
+            self.log_lines.extend(lines)
+            with span("ui.render_logs"):
+                self._render_logs(lines)
+            await asyncio.sleep(LOG_FRAME_INTERVAL)
+
+    @staticmethod
+    def _format_log(msg) -> str:
+        # Producers already send JSON strings; only wrap the ones that aren't
+        if isinstance(msg, str):
+            return msg if msg[:1] in ("{", "[") else json.dumps({"message": msg})
+        return json.dumps(msg)
+
+    def _render_logs(self, lines):
+        if not self.logs_view.page:
+            return  # tab not built yet; it renders from log_lines when opened
+        if self.log_offset:
+            # Reading older entries: keep the page still, just move the offset along
+            self.log_offset = min(self.log_offset + len(lines), max(0, len(self.log_lines) - LOG_VISIBLE))
+        else:
+            controls = self.logs.controls
+            controls.extend(ft.Text(line) for line in lines[-LOG_VISIBLE:])
+            if len(controls) > LOG_VISIBLE:
+                del controls[:len(controls) - LOG_VISIBLE]
+        self._update_log_status()
+        self.logs_view.update()
+
+    def _page_logs(self, delta):
+        newest = max(0, len(self.log_lines) - LOG_VISIBLE)
+        self.log_offset = 0 if delta is None else max(0, min(newest, self.log_offset + delta))
+        end = len(self.log_lines) - self.log_offset
+        start = max(0, end - LOG_VISIBLE)
+        self.logs.controls = [ft.Text(line) for line in islice(self.log_lines, start, end)]
+        self.logs.auto_scroll = self.log_offset == 0
+        self._update_log_status()
+        self.logs_view.update()
+
+    def _update_log_status(self):
+        where = "latest" if not self.log_offset else f"{self.log_offset} lines back"
+        self.log_status.value = f"{len(self.log_lines)} retained · {where}"
+
+    async def stream_notes(self, chunks):
+        """Append streamed model output to the Notes tab (and the logs) as it arrives."""
+        if self.notes_md.value:
+            self.notes_md.value += "\n\n---\n\n"
+        async for chunk in chunks:
+            self.notes_md.value += chunk
+            self.notes_md.update()
+            await self.logs_queue.put(json.dumps({"stage": "stream", "text": chunk}))
+
+    async def _search(self, e):
+        self.search_seq += 1
+        seq = self.search_seq
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        if seq != self.search_seq:
+            return  # a newer keystroke superseded this one
+        query = self.search_field.value.strip()
+        hits = await asyncio.to_thread(get_store().search, query, SEARCH_LIMIT) if query else []
+        if seq != self.search_seq:
+            return
+        self.search_results.controls = [
+            ft.ListTile(
+                dense=True,
+                title=ft.Text(f"{hit['name']} · {hit['agent'] or '?'}", size=12),
+                subtitle=ft.Markdown(hit["snippet"]),
+            )
+            for hit in hits
+        ]
+        self.search_results.update()
+
+    async def refresh_agenda(self, days=AGENDA_DAYS):
+        """Fill the Tasks tab with every occurrence (recurring ones expanded) in the next `days` days."""
+        index = await asyncio.to_thread(get_index)
+        with span("ui.agenda"):
+            upcoming = index.agenda(days, limit=AGENDA_LIMIT)
+        self.tasks.controls = [
+            ft.ListTile(
+                dense=True,
+                leading=ft.Icon(ft.Icons.REPEAT if occ["item"].get("recurring") else ft.Icons.EVENT, size=16),
+                title=ft.Text(occ["item"].get("title") or "(untitled)", size=13),
+                subtitle=ft.Text(occ["start"].strftime("%a %d %b %H:%M"), size=11, color=Colors.MUTED),
+            )
+            for occ in upcoming
+        ] or [ft.Text(f"Nothing due in the next {days} days", size=12, color=Colors.MUTED)]
+        if self.tasks.page:
+            self.tasks.update()
+
+    async def _bind_budget(self):
+        budget = await asyncio.to_thread(get_budget)
+        budget.subscribe(self._on_budget)
+
+    def _on_budget(self, budget, changed):
+        with span("ui.render_budget"):
+            self._render_budget(budget, changed)
+
+    def _render_budget(self, budget, changed):
+        """Budget moved: touch only the pie sections for `changed` categories."""
+        month = budget.latest_month
+        latest = f" · {month}: {budget.months[month]:,.2f}" if month else ""
+        self.budget_summary.value = f"{budget.counts['receipts']} receipts · total {budget.total:,.2f}{latest}"
+        if BUDGET_CHART == "plotly":
+            self._plotly_budget(budget)
+            return
+
+        added = False
+        for category in changed:
+            total = budget.categories[category]
+            section = self.budget_sections.get(category)
+            if section is None:
+                section = ft.PieChartSection(
+                    value=total,
+                    title=f"{category}\n{total:,.0f}",
+                    color=BUDGET_PALETTE[len(self.budget_sections) % len(BUDGET_PALETTE)],
+                    radius=80,
+                    title_style=ft.TextStyle(size=11, weight=ft.FontWeight.W_600),
+                )
+                self.budget_sections[category] = section
+                self.budget_chart.sections.append(section)
+                added = True
+            else:
+                section.value = total
+                section.title = f"{category}\n{total:,.0f}"
+        if not self.budget_view.page:
+            return
+        if added:
+            self.budget_chart.update()
+        else:
+            for category in changed:
+                self.budget_sections[category].update()
+        self.budget_summary.update()
+
+    def _plotly_budget(self, budget):
+        # Optional fallback; plotly is only imported if it's asked for
+        import plotly.graph_objects as go
+        from flet.plotly_chart import PlotlyChart
+
+        fig = go.Figure(data=[go.Pie(labels=list(budget.categories), values=list(budget.categories.values()))])
         fig.update_layout(margin=dict(l=5,r=5,t=5,b=5), height=250, paper_bgcolor="rgba(0,0,0,0)")
-        return fig
\ No newline at end of file
+        self.budget_view.controls[0] = PlotlyChart(fig, expand=True)
+        if self.budget_view.page:
+            self.budget_view.update()
@@ -1,5 +1,13 @@
+import asyncio
+import os
 import flet as ft
 from app.styles import Colors, Spacing
+from app.utils.budget import get_budget
+from app.utils.metrics import METRICS_ENABLED, registry
+
+# Seconds between live metrics refreshes
+METRICS_REFRESH = float(os.getenv("METRICS_REFRESH", "2"))
+METRIC_ROWS = ("Files", "OCR pages", "Cache hits", "Tokens", "Uploaded", "Errors")
 
 class KPI(ft.Container):
     def __init__(self, label, value, icon):
@@ -10,13 +18,14 @@ class KPI(ft.Container):
         self.build()
 
     def build(self):
+        self.value_text = ft.Text(str(self.value), size=22, weight=ft.FontWeight.BOLD)
         self.content = ft.Column(
             [
                 ft.Row([
                     ft.Icon(self.icon, color=Colors.ACCENT_BLUE, size=20),
                     ft.Text(self.label, color=Colors.MUTED, size=12),
                 ]),
-                ft.Text(str(self.value), size=22, weight=ft.FontWeight.BOLD),
+                self.value_text,
             ],
             spacing=4,
         )
@@ -24,6 +33,34 @@ class KPI(ft.Container):
         self.padding = Spacing.MD
         self.border_radius = 12
 
+    def set_value(self, value):
+        """Change the number in place (one Text diff, no rebuild)."""
+        if value == self.value:
+            return
+        self.value = value
+        self.value_text.value = str(value)
+        if self.value_text.page:
+            self.value_text.update()
+
+
+def _metric_lines(snap: dict) -> dict:
+    """The few numbers worth a glance, as display strings keyed by row label."""
+    counters, spans = snap["counters"], snap["spans"]
+    files = spans.get("pipeline.file", {})
+    pages = spans.get("ocr.page", {}).get("count", 0) + spans.get("ocr.image", {}).get("count", 0)
+    cache = snap.get("cache") or {}
+    lookups = cache.get("hits", 0) + cache.get("misses", 0)
+    tokens = counters.get("gemini.tokens.prompt", 0) + counters.get("gemini.tokens.output", 0)
+    processed = counters.get("pipeline.files", 0)
+    return {
+        "Files": f"{processed:,.0f} · p95 {files.get('p95', 0):.1f}s",
+        "OCR pages": f"{pages:,}",
+        "Cache hits": f"{cache.get('hits', 0) / lookups:.0%}" if lookups else "–",
+        "Tokens": f"{tokens:,.0f}",
+        "Uploaded": f"{counters.get('upload.bytes', 0) / 1e6:,.1f} MB",
+        "Errors": f"{counters.get('pipeline.errors', 0) / processed:.1%}" if processed else "–",
+    }
+
 
 class AnalyticsSidebar:
     def __init__(self, page: ft.Page):
@@ -32,12 +69,55 @@ class AnalyticsSidebar:
         self.kpi_tasks = KPI("Tasks", 0, ft.Icons.CHECK_CIRCLE)
         self.kpi_receipts = KPI("Receipts", 0, ft.Icons.RECEIPT_LONG)
 
+        self.metric_values = {label: ft.Text("–", size=12, weight=ft.FontWeight.W_600) for label in METRIC_ROWS}
+        self.metrics_panel = ft.Container(
+            content=ft.Column(
+                [
+                    ft.Row(
+                        [ft.Text(label, size=12, color=Colors.MUTED), text],
+                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                    )
+                    for label, text in self.metric_values.items()
+                ],
+                spacing=2,
+            ),
+            bgcolor=Colors.SURFACE,
+            padding=Spacing.MD,
+            border_radius=12,
+            visible=METRICS_ENABLED,
+        )
+
         self.view = ft.ResponsiveRow(
             [
                 ft.Column(
-                    [self.kpi_notes, self.kpi_tasks, self.kpi_receipts],
+                    [self.kpi_notes, self.kpi_tasks, self.kpi_receipts, self.metrics_panel],
                     spacing=Spacing.MD
                 )
             ],
             run_spacing=Spacing.SM
         )
+
+        asyncio.create_task(self._bind_budget())
+        if METRICS_ENABLED:
+            asyncio.create_task(self._watch_metrics())
+
+    async def _bind_budget(self):
+        budget = await asyncio.to_thread(get_budget)
+        budget.subscribe(self._on_budget)
+
+    def _on_budget(self, budget, changed):
+        self.kpi_notes.set_value(budget.counts["notes"])
+        self.kpi_tasks.set_value(budget.counts["tasks"])
+        self.kpi_receipts.set_value(budget.counts["receipts"])
+
+    async def _watch_metrics(self):
+        """Refresh the live numbers every METRICS_REFRESH seconds, updating only rows that changed."""
+        while True:
+            snap = await asyncio.to_thread(registry.snapshot)
+            for label, value in _metric_lines(snap).items():
+                text = self.metric_values[label]
+                if text.value != value:
+                    text.value = value
+                    if text.page:
+                        text.update()
+            await asyncio.sleep(METRICS_REFRESH)
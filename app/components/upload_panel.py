@@ -1,11 +1,13 @@
 import flet as ft
 from app.styles import Colors, Spacing
-from app.agents.router_agent import RouterAgent
+from app.agents.pipeline import IngestPipeline
 
 class UploadPanel:
-    def __init__(self, page: ft.Page, on_submit):
+    def __init__(self, page: ft.Page, on_submit, logs_queue=None, router_signal=None):
         self.page = page
         self.on_submit = on_submit
+        self.logs_queue = logs_queue
+        self.router_signal = router_signal
         self.files = []
         self.previews = ft.ResponsiveRow(run_spacing=Spacing.SM)
 
@@ -36,7 +38,7 @@ class UploadPanel:
         )
 
         self.submit_btn = ft.FloatingActionButton(
-            icon=ft.Icons.SEND, text="Send", on_click=lambda e: self._submit(),
+            icon=ft.Icons.SEND, text="Send", on_click=self._submit,
         )
 
         self.view = ft.Column(
@@ -76,20 +78,22 @@ class UploadPanel:
         self.previews.controls = previews
         self.previews.update()
 
-    def _submit(self):
-        agent = RouterAgent()  # instantiate your agent
-        results = []
+    async def _submit(self, e=None):
+        files = list(self.files)
+        self.submit_btn.disabled = True
+        self.submit_btn.update()
 
-        # Process each uploaded file through the agent
-        for f in self.files:
-            # You might need the full path if using local files
-            file_path = f.path or f.name
-            result = agent.classify_document(file_path)
-            results.append(result)
+        # Runs extract -> route -> parse for all files concurrently, off the UI loop
+        try:
+            pipeline = IngestPipeline(self.logs_queue, self.router_signal)
+            results = await pipeline.run([(f.path or f.name, f.name) for f in files])
+        finally:
+            self.submit_btn.disabled = False
+            self.submit_btn.update()
 
         payload = {
             "text": self.text_input.value,
-            "files": [{"name": f.name, "result": res} for f, res in zip(self.files, results)]
+            "files": [{"name": f.name, "result": res} for f, res in zip(files, results)]
         }
 
         # Call the original on_submit callback with structured results
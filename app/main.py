@@ -1,3 +1,6 @@
+import time
+_STARTED = time.perf_counter()
+
 import asyncio
 import json
 import os
@@ -37,8 +40,13 @@ async def main(page: ft.Page):
     page.session.set("api", api)
 
     sidebar = AnalyticsSidebar(page)
-    upload_panel = UploadPanel(page, on_submit=lambda p: asyncio.create_task(submit_payload(p, api, page)))
     agent_tabs = AgentTabs(page, state.logs_queue, state.router_signal)
+    upload_panel = UploadPanel(
+        page,
+        on_submit=lambda p: asyncio.create_task(submit_payload(p, api, page, agent_tabs)),
+        logs_queue=state.logs_queue,
+        router_signal=state.router_signal,
+    )
 
     drawer = ft.NavigationDrawer(
         controls=[
@@ -50,6 +58,8 @@ async def main(page: ft.Page):
     )
     page.drawer = drawer
 
+    first_paint = []
+
     def build_layout():
         page.controls.clear()
         width = page.width or 1080
@@ -88,12 +98,15 @@ async def main(page: ft.Page):
             ])
         page.add(layout)
         page.update()
+        if not first_paint:
+            first_paint.append(time.perf_counter() - _STARTED)
+            print(f"[Startup] First frame {first_paint[0]:.2f}s after app.main started importing")
 
     page.on_resize = lambda e: build_layout()
     build_layout()
 
     async def run_background():
-        ws_ok = True # await api.try_ws(state.logs_queue)
+        ws_ok = await api.try_ws(state.logs_queue)
         if not ws_ok:
             asyncio.create_task(api.poll_logs(state.logs_queue))
         if os.getenv("DEV_MOCK", "1") == "1":
@@ -101,7 +114,22 @@ async def main(page: ft.Page):
 
     asyncio.create_task(run_background())
 
-async def submit_payload(payload: dict, api: APIClient, page: ft.Page):
+async def submit_payload(payload: dict, api: APIClient, page: ft.Page, agent_tabs: AgentTabs):
+    # The pipeline has already stored and indexed the new tasks locally, so the
+    # agenda doesn't wait on (or depend on) the backend being up
+    try:
+        await agent_tabs.refresh_agenda()
+    except Exception as e:
+        print(f"[Console] Agenda refresh failed: {e}")
+
+    # Stream Gemini's answer to the typed prompt straight into the Notes tab
+    prompt = (payload.get("text") or "").strip()
+    if prompt:
+        try:
+            await agent_tabs.stream_notes(api.stream_text(prompt))
+        except Exception as e:
+            page.show_snack_bar(ft.SnackBar(ft.Text(f"Gemini failed: {e}")))
+
     try:
         await api.post_process(payload)
         page.show_snack_bar(ft.SnackBar(ft.Text("Submitted for processing ✅")))
@@ -1,23 +1,83 @@
 import os
-from google import genai
+import asyncio
+import random
+import threading
+import time
 import json
 
+from app.utils.cache import file_digest
+from app.utils.scheduler import INTERACTIVE, estimate_tokens, get_scheduler
+
+MODEL = "gemini-2.5-flash"
+
+# Chunked uploads: chunks in flight at once (across all files) and tries per chunk
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", "3"))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_genai_client(api_key=None):
+    """One google.genai client (and its connection pool) per API key per process."""
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                # Imported here: google.genai is slow to import and the UI doesn't need it to start
+                from google import genai
+                base = os.getenv("GEMINI_API_BASE")
+                options = {"base_url": base.rstrip("/") + "/"} if base else None
+                client = _clients[api_key] = genai.Client(api_key=api_key, http_options=options)
+    return client
+
+
+def _read_chunk(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def _parse_json(response_text: str) -> dict:
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        return {"error": "Failed to parse JSON", "raw": response_text}
+
+
 class APIClient:
     def __init__(self, api_key=None, api_base=None, ws_url=None):
         """
         Initializes the Gemini client and optional URLs for your backend.
         """
-        self.client = genai.Client(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        self.api_key = api_key
         self.api_base = api_base or "http://127.0.0.1:8000"
         self.ws_url = ws_url or "ws://127.0.0.1:8000/ws/logs"
 
+    @property
+    def client(self):
+        """The shared google.genai client, created on first use."""
+        return get_genai_client(self.api_key)
+
+    async def aclient(self):
+        """The shared client for async callers: the first use imports google.genai
+        (~1s) in a worker thread instead of freezing the UI loop."""
+        return await asyncio.to_thread(get_genai_client, self.api_key)
+
     def generate_text(self, prompt: str) -> str:
         """
         Sends a text prompt to Gemini 2.5-flash and returns raw text.
         """
-        response = self.client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
+        # UI requests jump ahead of background ingest in the shared scheduler
+        response = get_scheduler().call(
+            self.client.models.generate_content,
+            model=MODEL,
+            contents=prompt,
+            priority=INTERACTIVE,
+            tokens=estimate_tokens(prompt),
         )
         return response.text
 
@@ -25,11 +85,188 @@ class APIClient:
         """
         Sends a prompt expecting structured JSON and parses the result.
         """
-        response_text = self.generate_text(prompt)
+        return _parse_json(self.generate_text(prompt))
+
+    async def agenerate_text(self, prompt: str) -> str:
+        """
+        Async generate_text, safe to await from the Flet event loop.
+        """
+        client = await self.aclient()
+        response = await get_scheduler().acall(
+            client.aio.models.generate_content,
+            model=MODEL,
+            contents=prompt,
+            priority=INTERACTIVE,
+            tokens=estimate_tokens(prompt),
+        )
+        return response.text
+
+    async def agenerate_json(self, prompt: str) -> dict:
+        """
+        Async generate_json; asks for a JSON response instead of hoping for one.
+        """
+        client = await self.aclient()
+        response = await get_scheduler().acall(
+            client.aio.models.generate_content,
+            model=MODEL,
+            contents=prompt,
+            config={"response_mime_type": "application/json"},
+            priority=INTERACTIVE,
+            tokens=estimate_tokens(prompt),
+        )
+        return _parse_json(response.text)
+
+    async def stream_text(self, prompt: str):
+        """
+        Async iterator over the response text as Gemini produces it.
+        """
+        # Opening the stream goes through the scheduler (and its 429 retries);
+        # once chunks are flowing a failure is passed to the caller
+        client = await self.aclient()
+        stream = await get_scheduler().acall(
+            client.aio.models.generate_content_stream,
+            model=MODEL,
+            contents=prompt,
+            priority=INTERACTIVE,
+            tokens=estimate_tokens(prompt),
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+
+    async def post_process(self, payload: dict) -> dict:
+        """
+        Uploads the submission's files (skipping any the backend already has),
+        then sends it to the backend's /process endpoint.
+        """
+        import httpx
+        async with httpx.AsyncClient(base_url=self.api_base, timeout=60) as client:
+            sem = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+            files = [f for f in payload.get("files", []) if os.path.isfile((f.get("result") or {}).get("path") or "")]
+            uploads = await asyncio.gather(*(
+                self._upload(client, f["result"]["path"], f.get("name"), f["result"].get("sha256"), sem)
+                for f in files
+            ))
+            for f, upload in zip(files, uploads):
+                f["upload"] = upload
+            r = await client.post("/process", json=payload)
+            r.raise_for_status()
+            return r.json()
+
+    async def upload_file(self, path: str, name: str = None, digest: str = None) -> dict:
+        """
+        Resumable chunked upload of `path` to the backend's /uploads endpoints.
+        Nothing is sent if the backend already has these bytes; after an
+        interruption, calling it again sends only the chunks that didn't arrive.
+        """
+        import httpx
+        async with httpx.AsyncClient(base_url=self.api_base, timeout=60) as client:
+            return await self._upload(client, path, name, digest, asyncio.Semaphore(UPLOAD_CONCURRENCY))
+
+    async def _upload(self, client, path: str, name, digest, sem) -> dict:
+        import httpx
+        name = name or os.path.basename(path)
+        size = os.path.getsize(path)
+        digest = digest or await asyncio.to_thread(file_digest, path)
+        r = await client.post("/uploads", json={
+            "sha256": digest, "size": size, "name": name, "chunk_size": UPLOAD_CHUNK_SIZE,
+        })
+        r.raise_for_status()
+        state = r.json()
+        if state["status"] == "complete":
+            return state
+
+        upload_id, chunk_size = state["upload_id"], state["chunk_size"]
+
+        async def send(index):
+            async with sem:
+                # Read just this chunk, off the loop; at most UPLOAD_CONCURRENCY chunks are in memory
+                data = await asyncio.to_thread(_read_chunk, path, index * chunk_size, chunk_size)
+                for attempt in range(UPLOAD_RETRIES):
+                    try:
+                        r = await client.put(f"/uploads/{upload_id}/chunks/{index}", content=data)
+                    except httpx.TransportError:
+                        if attempt == UPLOAD_RETRIES - 1:
+                            raise
+                    else:
+                        if r.status_code < 500 or attempt == UPLOAD_RETRIES - 1:
+                            r.raise_for_status()
+                            return
+                    await asyncio.sleep(0.5 * 2 ** attempt * random.uniform(0.5, 1.5))
+
+        await asyncio.gather(*(send(i) for i in state["missing"]))
+        r = await client.post(f"/uploads/{upload_id}/complete")
+        r.raise_for_status()
+        return r.json()
+
+    async def try_ws(self, logs_queue, timeout: float = 3.0) -> bool:
+        """
+        Connects to the backend's /ws/logs hub. On success a background reader
+        (which reconnects by itself) feeds logs_queue and this returns True.
+        """
+        try:
+            import websockets
+        except ImportError:
+            return False
         try:
-            return json.loads(response_text)
-        except json.JSONDecodeError:
-            return {"error": "Failed to parse JSON", "raw": response_text}
+            ws = await asyncio.wait_for(websockets.connect(self.ws_url), timeout)
+        except Exception:
+            return False
+        self._ws_task = asyncio.create_task(self._ws_reader(ws, logs_queue))
+        return True
+
+    async def _ws_reader(self, ws, logs_queue):
+        import websockets
+        backoff = 0.5
+        while True:
+            try:
+                async for frame in ws:
+                    backoff = 0.5
+                    for line in json.loads(frame).get("lines", []):
+                        await logs_queue.put(line)
+            except Exception:
+                pass
+            # Reconnect with jittered exponential backoff
+            while True:
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+                backoff = min(backoff * 2, 30)
+                try:
+                    ws = await websockets.connect(self.ws_url)
+                    await logs_queue.put(json.dumps({"stage": "ws", "message": "reconnected"}))
+                    break
+                except Exception:
+                    continue
+
+    async def poll_logs(self, logs_queue):
+        """
+        HTTP long-poll fallback for when the websocket isn't reachable. Between
+        polls it keeps trying the websocket (jittered exponential backoff) and
+        returns once try_ws connects, leaving the websocket reader in charge.
+        """
+        import httpx
+        after = 0
+        backoff = 1.0
+        next_ws = time.monotonic() + backoff
+        async with httpx.AsyncClient(base_url=self.api_base, timeout=35) as client:
+            while True:
+                if time.monotonic() >= next_ws:
+                    if await self.try_ws(logs_queue):
+                        await logs_queue.put(json.dumps({"stage": "ws", "message": "connected"}))
+                        return
+                    backoff = min(backoff * 2, 30)
+                    next_ws = time.monotonic() + backoff * random.uniform(0.5, 1.5)
+                try:
+                    # Don't hold a long poll open past the next websocket attempt
+                    wait = max(1, min(25, round(next_ws - time.monotonic())))
+                    r = await client.get("/logs/poll", params={"after": after, "timeout": wait})
+                    r.raise_for_status()
+                    data = r.json()
+                    after = data["seq"]
+                    for line in data["lines"]:
+                        await logs_queue.put(line)
+                except Exception:
+                    await asyncio.sleep(2)
 
 
 class MockStream:
@@ -0,0 +1,113 @@
+# app/utils/budget.py
+import re
+import threading
+
+_MONTH = re.compile(r"^\d{4}-\d{2}")
+
+
+def category_of(receipt: dict) -> str:
+    return (str(receipt.get("category") or "").strip() or "Other").title()
+
+
+def month_of(receipt: dict) -> str:
+    match = _MONTH.match(str(receipt.get("date") or ""))
+    return match.group(0) if match else "undated"
+
+
+def amount_of(receipt: dict):
+    try:
+        return float(receipt.get("total"))
+    except (TypeError, ValueError):
+        return None
+
+
+class BudgetAggregator:
+    """
+    Running spend per category and per month plus the Notes/Tasks/Receipts
+    counters. Each new result is folded in with a few dict updates, and
+    listeners are told which categories moved so the UI only redraws those.
+    """
+
+    def __init__(self):
+        self.categories = {}  # category -> total
+        self.months = {}      # "YYYY-MM" -> total
+        self.counts = {"notes": 0, "tasks": 0, "receipts": 0}
+        self.total = 0.0
+        self.latest_month = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def _add_receipt(self, receipt: dict):
+        self.counts["receipts"] += 1
+        amount = amount_of(receipt)
+        if amount is None:
+            return None
+        category = category_of(receipt)
+        self.categories[category] = self.categories.get(category, 0.0) + amount
+        month = month_of(receipt)
+        self.months[month] = self.months.get(month, 0.0) + amount
+        if month != "undated" and (self.latest_month is None or month > self.latest_month):
+            self.latest_month = month
+        self.total += amount
+        return category
+
+    def add_result(self, agent: str, items: list):
+        """Fold in one parsed document (its extracted items) for `agent`."""
+        changed = set()
+        with self._lock:
+            if agent == "FinanceAgent":
+                for receipt in items:
+                    category = self._add_receipt(receipt)
+                    if category:
+                        changed.add(category)
+            elif agent == "TaskAgent":
+                self.counts["tasks"] += len(items)
+            elif agent == "NoteAgent":
+                self.counts["notes"] += 1
+            else:
+                return
+        self._notify(changed)
+
+    def load(self, counts: dict, rows):
+        """Seed from stored data: counts plus (category, date, total) receipt rows."""
+        with self._lock:
+            self.counts.update(counts)
+            for category, day, total in rows:
+                receipt = {"category": category, "date": day, "total": total}
+                self._add_receipt(receipt)
+            self.counts["receipts"] = counts.get("receipts", self.counts["receipts"])
+        self._notify(set(self.categories))
+
+    def subscribe(self, callback):
+        """callback(aggregator, changed_categories) on every update; called once right away."""
+        self._listeners.append(callback)
+        callback(self, set(self.categories))
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, changed):
+        for callback in list(self._listeners):
+            try:
+                callback(self, changed)
+            except Exception as e:
+                print(f"[Budget] listener failed: {e}")
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_budget() -> BudgetAggregator:
+    """Process-wide aggregator, seeded from the document store on first use."""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                from app.utils.store import get_store
+                store = get_store()
+                budget = BudgetAggregator()
+                budget.load(store.counts(), store.receipt_rows())
+                _budget = budget
+    return _budget
@@ -0,0 +1,146 @@
+# app/utils/cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv(
+    "GEMINIDESK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "geminidesk")
+)
+CACHE_MAX_BYTES = int(os.getenv("GEMINIDESK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MAX_AGE = float(os.getenv("GEMINIDESK_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file's contents, read in chunks so big PDFs don't sit in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(*parts) -> str:
+    """Build a cache key from content hash, model name, prompt, page number, ..."""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent key -> text cache backed by SQLite.
+    Entries older than max_age are dropped, and once the total size goes over
+    max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path=None, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "results.sqlite3")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, size, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, size, created = row
+            if self.max_age and now - created > self.max_age:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total -= size
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        if self.max_age:
+            cutoff = now - self.max_age
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE created < ?", (cutoff,)
+            ).fetchone()
+            if count:
+                self._db.execute("DELETE FROM entries WHERE created < ?", (cutoff,))
+                self._total -= size
+                self.evictions += count
+
+        # Trim to 90% so we don't evict again on the very next insert
+        target = int(self.max_bytes * 0.9)
+        if self._total <= target:
+            return
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if self._total <= target:
+                break
+            doomed.append((key,))
+            self._total -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self._total,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """Process-wide cache instance, opened on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+                from app.utils.metrics import registry
+                registry.register("cache", _cache.stats)
+    return _cache
@@ -0,0 +1,71 @@
+# app/utils/import_timing.py
+# Startup import profile: python -m app.utils.import_timing [module] [--top N] [--json]
+# Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+# summarises where the time goes.
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# Imports that should not happen before the console's first frame
+HEAVY = ["google.generativeai", "google.genai", "plotly", "PIL", "pypdf", "pdf2image", "httpx", "fastapi"]
+
+
+def profile(module: str = "app.main") -> dict:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    by_package = {}
+    for name, self_us, _ in rows:
+        top = name.split(".")[0]
+        if top == "google" and "." in name:
+            top = ".".join(name.split(".")[:2])
+        by_package[top] = by_package.get(top, 0) + self_us
+    names = {name for name, _, _ in rows}
+    return {
+        "module": module,
+        "wall_s": round(wall, 3),
+        "import_s": round(next((c for n, _, c in rows if n == module), 0) / 1e6, 3),
+        "modules": len(rows),
+        "packages": sorted(((p, round(us / 1e6, 3)) for p, us in by_package.items()), key=lambda x: -x[1]),
+        "slowest": sorted(((n, round(c / 1e6, 3)) for n, _, c in rows), key=lambda x: -x[1]),
+        "heavy_loaded": [h for h in HEAVY if h in names],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time breakdown of a module")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = profile(args.module)
+    report["packages"] = report["packages"][:args.top]
+    report["slowest"] = report["slowest"][:args.top]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n⏱  import {report['module']}: {report['import_s']:.3f}s "
+              f"({report['modules']} modules, {report['wall_s']:.3f}s wall incl. interpreter)")
+        print("\nBy package (self time):")
+        for name, secs in report["packages"]:
+            print(f"  {secs:7.3f}s  {name}")
+        print("\nSlowest imports (cumulative):")
+        for name, secs in report["slowest"]:
+            print(f"  {secs:7.3f}s  {name}")
+        print(f"\nHeavy modules loaded at import: {', '.join(report['heavy_loaded']) or 'none'}")
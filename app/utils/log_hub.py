@@ -0,0 +1,136 @@
+# app/utils/log_hub.py
+import asyncio
+import json
+import os
+from collections import deque
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+# Per-console buffer; a console that falls further behind loses its oldest lines
+LOG_SUBSCRIBER_QUEUE = int(os.getenv("LOG_SUBSCRIBER_QUEUE", "1000"))
+# Lines per websocket frame, and the pause between frames to a single console
+LOG_FRAME_MAX = int(os.getenv("LOG_FRAME_MAX", "200"))
+LOG_HUB_FRAME_INTERVAL = float(os.getenv("LOG_HUB_FRAME_INTERVAL", "0.05"))
+# Lines kept for the long-poll fallback
+LOG_HISTORY = int(os.getenv("LOG_HISTORY", "2000"))
+
+
+class Subscriber:
+    """One connected console: a bounded queue that drops its oldest lines when full."""
+
+    def __init__(self, maxsize=LOG_SUBSCRIBER_QUEUE):
+        self.lines = deque()
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def offer(self, line: str):
+        if len(self.lines) >= self.maxsize:
+            self.lines.popleft()
+            self.dropped += 1
+        self.lines.append(line)
+        self._ready.set()
+
+    async def next_batch(self, max_lines=LOG_FRAME_MAX) -> list:
+        await self._ready.wait()
+        batch = []
+        if self.dropped:
+            # Coalesce everything we threw away into one marker line
+            batch.append(json.dumps({"stage": "log_hub", "dropped": self.dropped}))
+            self.dropped = 0
+        while self.lines and len(batch) < max_lines:
+            batch.append(self.lines.popleft())
+        if not self.lines:
+            self._ready.clear()
+        return batch
+
+
+class LogHub:
+    """
+    Fan-out of log lines to every connected console. publish() never waits on
+    a subscriber, so one slow websocket can't hold up the others or the producer.
+    """
+
+    def __init__(self, history=LOG_HISTORY):
+        self.subscribers = set()
+        self.history = deque(maxlen=history)  # (seq, line)
+        self.seq = 0
+        self._changed = asyncio.Event()
+
+    def publish(self, line):
+        if not isinstance(line, str):
+            line = json.dumps(line)
+        self.seq += 1
+        self.history.append((self.seq, line))
+        for sub in self.subscribers:
+            sub.offer(line)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber()
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self.subscribers.discard(sub)
+
+    async def poll(self, after: int, timeout: float):
+        """Lines published after `after`, waiting up to `timeout` seconds for the first one."""
+        if after > self.seq:
+            after = 0  # hub restarted since the client last polled
+        if self.seq == after:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return self.seq, []
+        lines = [line for seq, line in self.history if seq > after]
+        return self.seq, lines[-LOG_FRAME_MAX * 5:]
+
+
+hub = LogHub()
+router = APIRouter()
+
+
+async def _send_batches(ws: WebSocket, sub: Subscriber):
+    while True:
+        lines = await sub.next_batch()
+        await ws.send_text(json.dumps({"lines": lines}))
+        # Let lines pile up into the next frame instead of one frame per line
+        await asyncio.sleep(LOG_HUB_FRAME_INTERVAL)
+
+
+async def _until_closed(ws: WebSocket):
+    # Consoles never send anything; reading is how an idle hub hears about a disconnect
+    while (await ws.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws/logs")
+async def ws_logs(ws: WebSocket):
+    await ws.accept()
+    sub = hub.subscribe()
+    tasks = [asyncio.ensure_future(_send_batches(ws, sub)), asyncio.ensure_future(_until_closed(ws))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            try:
+                task.result()
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(sub)
+
+
+@router.get("/logs/poll")
+async def poll_logs(after: int = 0, timeout: float = 25):
+    seq, lines = await hub.poll(after, max(0.0, min(timeout, 30.0)))
+    return {"seq": seq, "lines": lines}
+
+
+@router.post("/logs")
+async def post_log(entry: dict):
+    hub.publish(entry)
+    return {"ok": True}
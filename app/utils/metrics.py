@@ -0,0 +1,180 @@
+# app/utils/metrics.py
+# In-process spans, counters and latency histograms. Recording is a dict update
+# and a bisect under a lock; with GEMINIDESK_METRICS=0 every call returns at once.
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+METRICS_ENABLED = os.getenv("GEMINIDESK_METRICS", "1") == "1"
+# Recent finished spans kept for inspection (/metrics?spans=N)
+SPAN_HISTORY = int(os.getenv("METRICS_SPAN_HISTORY", "200"))
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; percentiles are bucket upper bounds."""
+
+    __slots__ = ("bounds", "buckets", "count", "total", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.spans = deque(maxlen=SPAN_HISTORY)
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the block as `name`; exceptions count towards `name.errors` and propagate."""
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                hist = self.histograms.get(name)
+                if hist is None:
+                    hist = self.histograms[name] = Histogram()
+                hist.observe(elapsed)
+                if not ok:
+                    key = name + ".errors"
+                    self.counters[key] = self.counters.get(key, 0) + 1
+                self.spans.append({"name": name, "seconds": round(elapsed, 6), "ok": ok, "at": time.time(), **attrs})
+
+    def register(self, name: str, collector):
+        """Include collector() (e.g. cache or scheduler stats) in every snapshot."""
+        self._collectors[name] = collector
+
+    def snapshot(self, spans: int = 0) -> dict:
+        with self._lock:
+            histograms = {name: hist.snapshot() for name, hist in self.histograms.items()}
+            counters = dict(self.counters)
+            recent = list(self.spans)[-spans:] if spans else []
+        for name, hist in histograms.items():
+            hist["errors"] = counters.get(name + ".errors", 0)
+            hist["error_rate"] = hist["errors"] / hist["count"] if hist["count"] else 0.0
+        snap = {
+            "enabled": METRICS_ENABLED,
+            "uptime": round(time.time() - self.started, 1),
+            "counters": counters,
+            "spans": histograms,
+        }
+        for name, collector in self._collectors.items():
+            try:
+                snap[name] = collector()
+            except Exception as e:
+                snap[name] = {"error": str(e)}
+        if recent:
+            snap["recent"] = recent
+        return snap
+
+    def prometheus(self) -> str:
+        """Text exposition format for scrapers."""
+        def metric(name):
+            return "geminidesk_" + "".join(c if c.isalnum() else "_" for c in name)
+
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{metric(name)}_total {value}")
+            for name, hist in sorted(self.histograms.items()):
+                base, seen = metric(name) + "_seconds", 0
+                for bound, n in zip(hist.bounds, hist.buckets):
+                    seen += n
+                    lines.append(f'{base}_bucket{{le="{bound}"}} {seen}')
+                lines.append(f'{base}_bucket{{le="+Inf"}} {hist.count}')
+                lines.append(f"{base}_sum {hist.total}")
+                lines.append(f"{base}_count {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Metrics()
+
+
+def span(name: str, **attrs):
+    return registry.span(name, **attrs) if METRICS_ENABLED else _DISABLED
+
+
+def inc(name: str, amount: float = 1):
+    if METRICS_ENABLED:
+        registry.inc(name, amount)
+
+
+def observe(name: str, seconds: float):
+    if METRICS_ENABLED:
+        registry.observe(name, seconds)
+
+
+def record_usage(response):
+    """Token counts from a Gemini reply: SDK usage_metadata or REST usageMetadata."""
+    if not METRICS_ENABLED or response is None:
+        return
+    if isinstance(response, dict):
+        usage = response.get("usageMetadata") or {}
+        prompt, output = usage.get("promptTokenCount"), usage.get("candidatesTokenCount")
+    else:
+        usage = getattr(response, "usage_metadata", None)
+        prompt = getattr(usage, "prompt_token_count", None)
+        output = getattr(usage, "candidates_token_count", None)
+    if prompt:
+        registry.inc("gemini.tokens.prompt", prompt)
+    if output:
+        registry.inc("gemini.tokens.output", output)
@@ -0,0 +1,274 @@
+# app/utils/scheduler.py
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from app.utils.metrics import inc, observe, record_usage, span
+
+# Priority classes; lower goes first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "60"))
+
+RETRYABLE_STATUSES = (429, 503)
+
+# Roughly what Gemini bills for one inline image, and a default allowance for the reply
+IMAGE_TOKENS = 258
+OUTPUT_TOKENS = 512
+
+_priority = contextvars.ContextVar("gemini_priority", default=BACKGROUND)
+
+
+@contextmanager
+def priority(level: int):
+    """Run the calls made inside this block (and threads started from it) at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RetryableError(Exception):
+    """Raised by raw HTTP callers for a 429/503 so the scheduler backs off and retries."""
+
+    def __init__(self, status: int, message: str = "", retry_after: float = None):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def status_of(exc) -> int:
+    """Best-effort HTTP status of an SDK / httpx error, or None."""
+    for attr in ("status", "code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return int(value)
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def estimate_tokens(*parts) -> int:
+    """Rough token count for a prompt: ~4 chars per token, fixed cost per image."""
+    total = OUTPUT_TOKENS
+    for part in parts:
+        if isinstance(part, str):
+            total += len(part) // 4
+        elif isinstance(part, (list, tuple)):
+            total += estimate_tokens(*part) - OUTPUT_TOKENS
+        else:
+            total += IMAGE_TOKENS
+    return total
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single request bigger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _Ticket:
+    __slots__ = ("priority", "tokens", "queued")
+
+    def __init__(self, priority, tokens):
+        self.priority = priority
+        self.tokens = tokens
+        self.queued = time.monotonic()
+
+
+class GeminiScheduler:
+    """
+    Process-wide gate in front of every Gemini call. Calls wait in a priority
+    queue (interactive before background, FIFO within a class) until both the
+    requests/minute and tokens/minute buckets allow them. 429/503 responses
+    widen an adaptive, jittered backoff window that every caller respects.
+    """
+
+    def __init__(self, rpm=GEMINI_RPM, tpm=GEMINI_TPM, max_retries=GEMINI_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._backoff = 0.0
+        self._paused_until = 0.0
+        self.throttled = 0
+        self._waits = {p: [0, 0.0, 0.0] for p in PRIORITY_NAMES}  # calls, total wait, max wait
+
+    # -- admission -------------------------------------------------------
+
+    def _enqueue(self, priority, tokens) -> _Ticket:
+        ticket = _Ticket(priority, tokens)
+        heapq.heappush(self._queue, (priority, next(self._seq), ticket))
+        return ticket
+
+    def _try_grant(self, ticket) -> float:
+        """Grant `ticket` if it's at the head and the buckets allow; else seconds to wait."""
+        if self._queue[0][2] is not ticket:
+            return None
+        now = time.monotonic()
+        wait = max(
+            self._paused_until - now,
+            self._requests.delay(1, now),
+            self._tokens.delay(ticket.tokens, now),
+        )
+        if wait > 0:
+            return wait
+        self._requests.take(1)
+        self._tokens.take(ticket.tokens)
+        heapq.heappop(self._queue)
+        stats = self._waits[ticket.priority]
+        waited = now - ticket.queued
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2], waited)
+        observe("gemini.queue_wait", waited)
+        self._cond.notify_all()
+        return 0.0
+
+    def acquire(self, priority: int = None, tokens: int = OUTPUT_TOKENS):
+        """Block the calling thread until the call may go out."""
+        priority = _priority.get() if priority is None else priority
+        with self._cond:
+            ticket = self._enqueue(priority, tokens)
+            while True:
+                wait = self._try_grant(ticket)
+                if wait == 0:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self, priority: int = None, tokens: int = OUTPUT_TOKENS):
+        """Event-loop friendly acquire: waits with asyncio.sleep instead of blocking."""
+        priority = _priority.get() if priority is None else priority
+        with self._cond:
+            ticket = self._enqueue(priority, tokens)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_grant(ticket)
+                if wait == 0:
+                    return
+                await asyncio.sleep(min(wait or 0.05, 0.25))
+        except asyncio.CancelledError:
+            with self._cond:
+                self._queue = [entry for entry in self._queue if entry[2] is not ticket]
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+            raise
+
+    # -- feedback --------------------------------------------------------
+
+    def report_throttled(self, retry_after: float = None):
+        inc("gemini.throttled")
+        with self._cond:
+            self.throttled += 1
+            self._backoff = min(BACKOFF_MAX, max(BACKOFF_BASE, self._backoff * 2))
+            delay = retry_after if retry_after else self._backoff * random.uniform(0.5, 1.5)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+
+    def report_success(self):
+        if self._backoff:
+            with self._cond:
+                self._backoff /= 2
+                if self._backoff < BACKOFF_BASE:
+                    self._backoff = 0.0
+
+    # -- wrappers --------------------------------------------------------
+
+    def _retry_after(self, exc, attempt):
+        if status_of(exc) not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+            return False
+        self.report_throttled(getattr(exc, "retry_after", None))
+        return True
+
+    def call(self, fn, *args, priority: int = None, tokens: int = OUTPUT_TOKENS, **kwargs):
+        """Run a blocking SDK call under the limits, retrying 429/503 with backoff."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(priority, tokens)
+            try:
+                with span("gemini.call"):
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                if self._retry_after(e, attempt):
+                    continue
+                raise
+            self.report_success()
+            record_usage(result)
+            return result
+
+    async def acall(self, fn, *args, priority: int = None, tokens: int = OUTPUT_TOKENS, **kwargs):
+        """Async version of call() for coroutine functions."""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(priority, tokens)
+            try:
+                with span("gemini.call"):
+                    result = await fn(*args, **kwargs)
+            except Exception as e:
+                if self._retry_after(e, attempt):
+                    continue
+                raise
+            self.report_success()
+            record_usage(result)
+            return result
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for p, _, _ in self._queue:
+                depth[PRIORITY_NAMES.get(p, str(p))] += 1
+            waits = {
+                PRIORITY_NAMES[p]: {
+                    "calls": calls,
+                    "avg_wait": total / calls if calls else 0.0,
+                    "max_wait": longest,
+                }
+                for p, (calls, total, longest) in self._waits.items()
+            }
+            return {
+                "queue_depth": depth,
+                "waits": waits,
+                "throttled": self.throttled,
+                "backoff": self._backoff,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> GeminiScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = GeminiScheduler()
+                from app.utils.metrics import registry
+                registry.register("scheduler", _scheduler.stats)
+    return _scheduler
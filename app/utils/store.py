@@ -0,0 +1,272 @@
+# app/utils/store.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from app.utils.cache import CACHE_DIR
+
+STORE_PATH = os.getenv("GEMINIDESK_STORE", os.path.join(CACHE_DIR, "documents.sqlite3"))
+# bm25 only ranks the newest N matches, so a term that's in every document stays fast
+SEARCH_CANDIDATES = int(os.getenv("STORE_SEARCH_CANDIDATES", "1000"))
+# Words of context in a search hit's snippet
+SNIPPET_WORDS = 12
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT,
+    hash TEXT UNIQUE,
+    agent TEXT,
+    confidence REAL,
+    summary TEXT,
+    text TEXT NOT NULL,
+    route TEXT,
+    parsed TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_agent ON documents(agent);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    name, summary, text, content='documents', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, name, summary, text) VALUES (new.id, new.name, new.summary, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, name, summary, text)
+    VALUES ('delete', old.id, old.name, old.summary, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, name, summary, text)
+    VALUES ('delete', old.id, old.name, old.summary, old.text);
+    INSERT INTO documents_fts(rowid, name, summary, text) VALUES (new.id, new.name, new.summary, new.text);
+END;
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER REFERENCES documents(id) ON DELETE CASCADE,
+    title TEXT, due_date TEXT, time_start TEXT, category TEXT, location TEXT,
+    recurring TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks(due_date);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER REFERENCES documents(id) ON DELETE CASCADE,
+    title TEXT, start TEXT, "end" TEXT, location TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events(start);
+
+CREATE TABLE IF NOT EXISTS receipts (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER REFERENCES documents(id) ON DELETE CASCADE,
+    merchant TEXT, date TEXT, total REAL, currency TEXT, category TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS receipts_date ON receipts(date);
+"""
+
+
+def items_of(parsed) -> list:
+    """Chunked extractions come back as {"items": [...]}, single ones as a dict."""
+    if isinstance(parsed, dict) and isinstance(parsed.get("items"), list):
+        return [item for item in parsed["items"] if isinstance(item, dict)]
+    return [parsed] if isinstance(parsed, dict) else []
+
+
+def _fts_query(query: str) -> str:
+    # Quote every term so user input can't trip FTS syntax; prefix-match the last one
+    terms = ['"%s"' % term.replace('"', '""') for term in query.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _snippet(text: str, query: str, words: int = SNIPPET_WORDS) -> str:
+    """
+    About `words` words around the first hit, hits in **bold**. Done here rather
+    than with FTS5's snippet(), which re-tokenizes each returned document in full.
+    """
+    terms = [re.escape(term.strip('"*')) for term in query.split() if term.strip('"*')]
+    hit = re.compile(r"\b(?:%s)\w*" % "|".join(terms), re.I) if terms else None
+    found = hit.search(text) if hit else None
+    if found is None:
+        # Only a stemmed form matched: show the start
+        head = text.split(None, words)
+        return " ".join(head[:words]) + (" …" if len(head) > words else "")
+    before = text[:found.start()].split()[-(words // 3):]
+    after = text[found.start():].split(None, words - len(before))
+    window = " ".join(before + after[:words - len(before)])
+    window = hit.sub(lambda m: f"**{m.group(0)}**", window)
+    if len(text[:found.start()].split()) > len(before):
+        window = "… " + window
+    return window + (" …" if len(after) > words - len(before) else "")
+
+
+class DocumentStore:
+    """
+    Everything we've extracted, kept locally: full text in an FTS5 index plus
+    typed rows for tasks, events and receipts.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        self._replace_listeners = []
+
+    def on_replace(self, callback):
+        """callback(doc_ids) after add_document replaces those documents (same content hash)."""
+        if callback not in self._replace_listeners:
+            self._replace_listeners.append(callback)
+
+    def add_document(self, name, text, path=None, digest=None, route=None, parsed=None) -> int:
+        """Insert (or replace, for a known content hash) a document and its typed rows."""
+        route = route or {}
+        agent = route.get("agent")
+        replaced = []
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                if digest:
+                    replaced = [r[0] for r in self._db.execute("SELECT id FROM documents WHERE hash = ?", (digest,))]
+                    self._db.execute("DELETE FROM documents WHERE hash = ?", (digest,))
+                cur = self._db.execute(
+                    "INSERT INTO documents (name, path, hash, agent, confidence, summary, text, route, parsed, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, path, digest, agent, route.get("confidence"), route.get("content"), text,
+                     json.dumps(route), json.dumps(parsed) if parsed is not None else None, time.time()),
+                )
+                doc_id = cur.lastrowid
+                self._insert_typed(doc_id, agent, items_of(parsed))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if replaced:
+            for callback in list(self._replace_listeners):
+                try:
+                    callback(replaced)
+                except Exception as e:
+                    print(f"[Store] replace listener failed: {e}")
+        return doc_id
+
+    def _insert_typed(self, doc_id, agent, items):
+        if agent == "TaskAgent":
+            self._db.executemany(
+                "INSERT INTO tasks (doc_id, title, due_date, time_start, category, location, recurring, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(doc_id, t.get("title"), t.get("due_date"), t.get("time_start"), t.get("category"),
+                  t.get("location"), json.dumps(t["recurring"]) if t.get("recurring") else None, json.dumps(t))
+                 for t in items],
+            )
+        elif agent == "EventAgent":
+            self._db.executemany(
+                'INSERT INTO events (doc_id, title, start, "end", location, data) VALUES (?, ?, ?, ?, ?, ?)',
+                [(doc_id, e.get("title"), e.get("start"), e.get("end"), e.get("location"), json.dumps(e))
+                 for e in items],
+            )
+        elif agent == "FinanceAgent":
+            self._db.executemany(
+                "INSERT INTO receipts (doc_id, merchant, date, total, currency, category, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(doc_id, r.get("merchant"), r.get("date"), r.get("total"), r.get("currency"),
+                  r.get("category"), json.dumps(r)) for r in items],
+            )
+
+    def get_by_hash(self, digest: str):
+        """Stored route/parse result for this exact content, if we've seen it before."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, name, route, parsed FROM documents WHERE hash = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "route": json.loads(row["route"]) if row["route"] else None,
+            "parsed": json.loads(row["parsed"]) if row["parsed"] else None,
+        }
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """Ranked (bm25) full-text search with a highlighted snippet per hit; the last term is a prefix."""
+        match = _fts_query(query)
+        if not match:
+            return []
+        with self._lock:
+            # Rank on the FTS index alone; document rows are only read for the hits returned
+            ranked = self._db.execute(
+                "SELECT rowid, bm25(documents_fts, 10.0, 5.0, 1.0) AS rank FROM documents_fts "
+                "WHERE documents_fts MATCH ? AND rowid >= coalesce(("
+                "  SELECT rowid FROM documents_fts WHERE documents_fts MATCH ? "
+                "  ORDER BY rowid DESC LIMIT 1 OFFSET ?), 0) "
+                "ORDER BY rank LIMIT ?",
+                (match, match, SEARCH_CANDIDATES - 1, limit),
+            ).fetchall()
+            if not ranked:
+                return []
+            docs = {row["id"]: row for row in self._db.execute(
+                "SELECT id, name, agent, summary, text FROM documents WHERE id IN (%s)" % ",".join("?" * len(ranked)),
+                [doc_id for doc_id, _ in ranked],
+            )}
+        return [
+            {"id": doc_id, "name": docs[doc_id]["name"], "agent": docs[doc_id]["agent"],
+             "summary": docs[doc_id]["summary"], "snippet": _snippet(docs[doc_id]["text"], query), "rank": rank}
+            for doc_id, rank in ranked
+        ]
+
+    def _select(self, sql, args=()) -> list:
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [dict(row) for row in rows]
+
+    def tasks(self, due_before: str = None, limit: int = 200) -> list:
+        if due_before:
+            return self._select(
+                "SELECT * FROM tasks WHERE due_date <= ? ORDER BY due_date LIMIT ?", (due_before, limit)
+            )
+        return self._select("SELECT * FROM tasks ORDER BY id DESC LIMIT ?", (limit,))
+
+    def events(self, start: str = None, end: str = None, limit: int = 200) -> list:
+        return self._select(
+            "SELECT * FROM events WHERE start >= ? AND start < ? ORDER BY start LIMIT ?",
+            (start or "", end or "￿", limit),
+        )
+
+    def receipts(self, limit: int = 200) -> list:
+        return self._select("SELECT * FROM receipts ORDER BY date DESC LIMIT ?", (limit,))
+
+    def receipt_rows(self):
+        """(category, date, total) per receipt, for seeding the budget totals."""
+        with self._lock:
+            return self._db.execute("SELECT category, date, total FROM receipts").fetchall()
+
+    def counts(self) -> dict:
+        with self._lock:
+            notes = self._db.execute("SELECT COUNT(*) FROM documents WHERE agent = 'NoteAgent'").fetchone()[0]
+            tasks = self._db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+            receipts = self._db.execute("SELECT COUNT(*) FROM receipts").fetchone()[0]
+        return {"notes": notes, "tasks": tasks, "receipts": receipts}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> DocumentStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DocumentStore()
+    return _store
@@ -0,0 +1,284 @@
+# app/utils/uploads.py
+# Resumable, content-addressed chunked uploads for the FastAPI service.
+#
+#   POST /uploads                       {sha256, size, name, chunk_size?}
+#        -> {"status": "complete"} if we already have those bytes (nothing is sent),
+#           else {"upload_id", "chunk_size", "chunks", "missing": [...]}
+#   PUT  /uploads/{id}/chunks/{index}   raw bytes, streamed to their offset on disk
+#   GET  /uploads/{id}                  what's still missing (for resuming)
+#   POST /uploads/{id}/complete         sha256 check, then the file becomes blobs/<sha256>
+#
+# Asking again for the same sha256 returns the same upload_id, so an
+# interrupted client resumes by calling POST /uploads again and sending only `missing`.
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from app.utils.cache import CACHE_DIR, file_digest
+from app.utils.log_hub import hub
+from app.utils.metrics import inc, span
+
+UPLOAD_DIR = os.getenv("GEMINIDESK_UPLOAD_DIR", os.path.join(CACHE_DIR, "uploads"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(4 * 1024 ** 3)))
+# Partial uploads nobody has touched for this long are thrown away
+UPLOAD_MAX_AGE = float(os.getenv("UPLOAD_MAX_AGE", str(7 * 24 * 3600)))
+# Bytes of a chunk held in memory before they're written out
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id TEXT PRIMARY KEY,
+    sha256 TEXT UNIQUE NOT NULL,
+    name TEXT,
+    size INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    touched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    upload_id TEXT NOT NULL REFERENCES uploads(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    PRIMARY KEY (upload_id, idx)
+) WITHOUT ROWID;
+"""
+
+
+class UploadStore:
+    """Blobs on disk by sha256, plus an SQLite record of which chunks of each partial upload have arrived."""
+
+    def __init__(self, root=UPLOAD_DIR):
+        self.root = root
+        self.blobs = os.path.join(root, "blobs")
+        self.partial = os.path.join(root, "partial")
+        os.makedirs(self.blobs, exist_ok=True)
+        os.makedirs(self.partial, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "uploads.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blobs, sha256)
+
+    def part_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial, upload_id + ".part")
+
+    def has_blob(self, sha256: str, size: int = None) -> bool:
+        try:
+            return size is None or os.path.getsize(self.blob_path(sha256)) == size
+        except OSError:
+            return False
+
+    def get(self, upload_id: str):
+        with self._lock:
+            return self._db.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+
+    def open_upload(self, sha256: str, size: int, name: str, chunk_size: int):
+        """The partial upload for sha256, creating it (and its sparse .part file) if there isn't one."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT * FROM uploads WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is not None and row["size"] == size:
+                self._db.execute("UPDATE uploads SET touched = ? WHERE id = ?", (now, row["id"]))
+                return row
+            if row is not None:
+                # Same hash, different size: the earlier record is bogus
+                self._drop(row["id"])
+            upload_id = uuid.uuid4().hex
+            with open(self.part_path(upload_id), "wb") as f:
+                f.truncate(size)
+            self._db.execute(
+                "INSERT INTO uploads (id, sha256, name, size, chunk_size, created, touched) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (upload_id, sha256, name, size, chunk_size, now, now),
+            )
+            return self._db.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+
+    def missing(self, row) -> list:
+        total = chunk_count(row["size"], row["chunk_size"])
+        with self._lock:
+            have = {r[0] for r in self._db.execute("SELECT idx FROM chunks WHERE upload_id = ?", (row["id"],))}
+        return [i for i in range(total) if i not in have]
+
+    def mark(self, upload_id: str, index: int):
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO chunks (upload_id, idx) VALUES (?, ?)", (upload_id, index))
+            self._db.execute("UPDATE uploads SET touched = ? WHERE id = ?", (time.time(), upload_id))
+
+    def reset(self, upload_id: str):
+        """Content didn't verify: forget every chunk so the client sends them all again."""
+        with self._lock:
+            self._db.execute("DELETE FROM chunks WHERE upload_id = ?", (upload_id,))
+
+    def finish(self, row):
+        """Move the verified .part file into place as blobs/<sha256> and forget the upload."""
+        os.replace(self.part_path(row["id"]), self.blob_path(row["sha256"]))
+        with self._lock:
+            self._db.execute("DELETE FROM uploads WHERE id = ?", (row["id"],))
+
+    def _drop(self, upload_id: str):
+        self._db.execute("DELETE FROM uploads WHERE id = ?", (upload_id,))
+        try:
+            os.remove(self.part_path(upload_id))
+        except OSError:
+            pass
+
+    def purge_stale(self, max_age=UPLOAD_MAX_AGE) -> int:
+        with self._lock:
+            stale = [r[0] for r in self._db.execute(
+                "SELECT id FROM uploads WHERE touched < ?", (time.time() - max_age,))]
+            for upload_id in stale:
+                self._drop(upload_id)
+        return len(stale)
+
+
+def chunk_count(size: int, chunk_size: int) -> int:
+    return max(1, -(-size // chunk_size))
+
+
+def _write_at(f, offset: int, data: bytes):
+    f.seek(offset)
+    f.write(data)
+
+
+_uploads = None
+_uploads_lock = threading.Lock()
+
+
+def get_uploads() -> UploadStore:
+    global _uploads
+    if _uploads is None:
+        with _uploads_lock:
+            if _uploads is None:
+                _uploads = UploadStore()
+                _uploads.purge_stale()
+    return _uploads
+
+
+class UploadInit(BaseModel):
+    sha256: str
+    size: int
+    name: str = ""
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+
+
+router = APIRouter(prefix="/uploads")
+
+
+def _status(store: UploadStore, row) -> dict:
+    missing = store.missing(row)
+    return {
+        "status": "partial",
+        "upload_id": row["id"],
+        "sha256": row["sha256"],
+        "size": row["size"],
+        "chunk_size": row["chunk_size"],
+        "chunks": chunk_count(row["size"], row["chunk_size"]),
+        "missing": missing,
+    }
+
+
+def _row_or_404(store: UploadStore, upload_id: str):
+    row = store.get(upload_id)
+    if row is None:
+        raise HTTPException(404, detail="Unknown or finished upload")
+    return row
+
+
+@router.post("")
+async def init_upload(req: UploadInit):
+    sha256 = req.sha256.lower()
+    if not _SHA256.match(sha256):
+        raise HTTPException(422, detail="sha256 must be 64 hex characters")
+    if not 0 <= req.size <= UPLOAD_MAX_BYTES:
+        raise HTTPException(413, detail=f"File too large (max {UPLOAD_MAX_BYTES} bytes)")
+    store = await asyncio.to_thread(get_uploads)
+    if await asyncio.to_thread(store.has_blob, sha256, req.size):
+        inc("upload.deduplicated")
+        hub.publish({"stage": "upload", "file": req.name, "deduplicated": True})
+        return {"status": "complete", "sha256": sha256, "size": req.size, "deduplicated": True}
+
+    chunk_size = max(MIN_CHUNK_SIZE, min(req.chunk_size, MAX_CHUNK_SIZE))
+    row = await asyncio.to_thread(store.open_upload, sha256, req.size, req.name, chunk_size)
+    return await asyncio.to_thread(_status, store, row)
+
+
+@router.get("/{upload_id}")
+async def upload_status(upload_id: str):
+    store = await asyncio.to_thread(get_uploads)
+    row = _row_or_404(store, upload_id)
+    return await asyncio.to_thread(_status, store, row)
+
+
+@router.put("/{upload_id}/chunks/{index}")
+async def put_chunk(upload_id: str, index: int, request: Request):
+    """Stream one chunk to its offset in the .part file; at most UPLOAD_WRITE_BUFFER bytes sit in memory."""
+    store = await asyncio.to_thread(get_uploads)
+    row = _row_or_404(store, upload_id)
+    chunk_size, size = row["chunk_size"], row["size"]
+    if not 0 <= index < chunk_count(size, chunk_size):
+        raise HTTPException(416, detail="Chunk index out of range")
+    offset = index * chunk_size
+    expected = min(chunk_size, size - offset)
+
+    # Plain binary file object with seek + write: os.pwrite / O_WRONLY without O_BINARY break on Windows
+    part = await asyncio.to_thread(open, store.part_path(upload_id), "r+b")
+    received = 0
+    try:
+        with span("upload.chunk"):
+            buffer = bytearray()
+            async for piece in request.stream():
+                received += len(piece)
+                if received > expected:
+                    raise HTTPException(400, detail=f"Chunk {index} is longer than {expected} bytes")
+                buffer += piece
+                if len(buffer) >= UPLOAD_WRITE_BUFFER:
+                    await asyncio.to_thread(_write_at, part, offset + received - len(buffer), bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(_write_at, part, offset + received - len(buffer), bytes(buffer))
+    finally:
+        await asyncio.to_thread(part.close)
+    if received != expected:
+        raise HTTPException(400, detail=f"Chunk {index} has {received} bytes, expected {expected}")
+    await asyncio.to_thread(store.mark, upload_id, index)
+    inc("upload.received_bytes", received)
+    return {"index": index, "bytes": received}
+
+
+@router.post("/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    store = await asyncio.to_thread(get_uploads)
+    row = _row_or_404(store, upload_id)
+    missing = await asyncio.to_thread(store.missing, row)
+    if missing:
+        raise HTTPException(409, detail={"message": "Chunks missing", "missing": missing})
+    with span("upload.verify"):
+        actual = await asyncio.to_thread(file_digest, store.part_path(upload_id))
+    if actual != row["sha256"]:
+        await asyncio.to_thread(store.reset, upload_id)
+        inc("upload.corrupt")
+        raise HTTPException(422, detail="Content doesn't match sha256; send every chunk again")
+    try:
+        await asyncio.to_thread(store.finish, row)
+    except FileNotFoundError:
+        # A concurrent /complete for the same upload got there first
+        if not await asyncio.to_thread(store.has_blob, row["sha256"], row["size"]):
+            raise
+    hub.publish({"stage": "upload", "file": row["name"], "bytes": row["size"]})
+    return {"status": "complete", "sha256": row["sha256"], "size": row["size"], "deduplicated": False}
@@ -0,0 +1,84 @@
+# benchmarks/bench_ingest.py
+# Ingest throughput: a synthetic corpus through IngestPipeline.process_file
+# (extract -> route -> parse -> store), cold and then again with everything stored.
+#
+#   python -m benchmarks.bench_ingest [--texts 40 --images 8 --pdfs 8] [--out result.json]
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import ensure_mock, percentiles, write_result
+
+
+async def _timed(pipeline, path, kind):
+    started = time.perf_counter()
+    result = await pipeline.process_file(path)
+    return kind, time.perf_counter() - started, result
+
+
+async def _pass(files: dict) -> dict:
+    from app.agents.pipeline import IngestPipeline
+
+    pipeline = IngestPipeline()
+    jobs = [(path, kind) for kind, paths in files.items() for path in paths]
+    started = time.perf_counter()
+    done = await asyncio.gather(*(_timed(pipeline, path, kind) for path, kind in jobs))
+    wall = time.perf_counter() - started
+
+    by_kind = {}
+    for kind, seconds, result in done:
+        entry = by_kind.setdefault(kind, {"latency": [], "errors": 0})
+        entry["latency"].append(seconds)
+        entry["errors"] += "error" in result
+    size = sum(os.path.getsize(path) for path, _ in jobs)
+    return {
+        "files": len(jobs),
+        "wall_s": round(wall, 3),
+        "files_per_s": round(len(jobs) / wall, 2),
+        "mb_per_s": round(size / 1e6 / wall, 2),
+        "errors": sum(entry["errors"] for entry in by_kind.values()),
+        "by_kind": {
+            kind: {"errors": entry["errors"], "latency": percentiles(entry["latency"])}
+            for kind, entry in by_kind.items()
+        },
+    }
+
+
+def run(texts=40, images=8, pdfs=8, pdf_pages=8, seed=1) -> dict:
+    ensure_mock()
+    from app.utils.metrics import registry
+    from benchmarks import corpus
+
+    files = corpus.build(os.path.join(tempfile.mkdtemp(prefix="geminidesk-corpus-"), "corpus"),
+                         texts, images, pdfs, pdf_pages, seed)
+    cold = asyncio.run(_pass(files))
+    spans = registry.snapshot()["spans"]
+    warm = asyncio.run(_pass(files))
+    return {
+        "corpus": {"texts": texts, "images": images, "pdfs": pdfs, "pdf_pages": pdf_pages, "seed": seed},
+        "cold": cold,
+        "warm": warm,
+        "stages": {name: spans[name] for name in sorted(spans) if name.startswith(("pipeline.", "ocr.", "preprocess.", "route"))},
+        "summary": {
+            "ingest_files_per_s": cold["files_per_s"],
+            "ingest_warm_files_per_s": warm["files_per_s"],
+            "ingest_text_p95_s": cold["by_kind"].get("text", {}).get("latency", {}).get("p95"),
+            "ingest_image_p95_s": cold["by_kind"].get("image", {}).get("latency", {}).get("p95"),
+            "ingest_pdf_p95_s": cold["by_kind"].get("pdf", {}).get("latency", {}).get("p95"),
+            "ingest_errors": cold["errors"],
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest throughput against the mock Gemini server")
+    parser.add_argument("--texts", type=int, default=40)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--pdfs", type=int, default=8)
+    parser.add_argument("--pdf-pages", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    write_result(args.out, run(args.texts, args.images, args.pdfs, args.pdf_pages, args.seed))
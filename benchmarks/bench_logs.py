@@ -0,0 +1,119 @@
+# benchmarks/bench_logs.py
+# AgentTabs log consumer throughput: how fast _consume_logs drains a burst of
+# pipeline log lines, and how far behind it falls under a steady stream.
+# Runs headless: the Logs tab is attached to a stub page whose update() does
+# nothing, so the real render path (ft.Text per line, LOG_VISIBLE trimming)
+# runs but Flet's diff and transport to the client don't.
+#
+#   python -m benchmarks.bench_logs [--burst 100000] [--rate 5000 --seconds 3] [--out result.json]
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import ensure_mock, percentiles, write_result
+
+
+def _line(i: int) -> str:
+    return json.dumps({"file": f"doc_{i % 500}.pdf", "stage": "extracted", "chars": 1000 + i % 9000})
+
+
+async def _drained(tabs, queue, poll=0.001):
+    while queue.qsize():
+        await asyncio.sleep(poll)
+    # The batch taken off the queue last is still being formatted/rendered
+    await asyncio.sleep(poll)
+
+
+async def _burst(tabs, queue, n: int) -> dict:
+    from app.utils.metrics import registry
+
+    frames_before = registry.snapshot()["spans"].get("ui.render_logs", {}).get("count", 0)
+    started = time.perf_counter()
+    for i in range(n):
+        queue.put_nowait(_line(i))
+    enqueued = time.perf_counter() - started
+    await _drained(tabs, queue)
+    wall = time.perf_counter() - started
+    frames = registry.snapshot()["spans"].get("ui.render_logs", {}).get("count", 0) - frames_before
+    return {
+        "lines": n,
+        "wall_s": round(wall, 3),
+        "enqueue_s": round(enqueued, 3),
+        "lines_per_s": round(n / wall),
+        "frames": frames,
+        "lines_per_frame": round(n / frames, 1) if frames else None,
+        "retained": len(tabs.log_lines),
+    }
+
+
+async def _steady(tabs, queue, rate: int, seconds: float) -> dict:
+    """Produce `rate` lines/s in 10 ms ticks; sample queue depth to see whether the consumer keeps up."""
+    tick = 0.01
+    per_tick = max(1, int(rate * tick))
+    depths, sent, i = [], 0, 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for _ in range(per_tick):
+            queue.put_nowait(_line(i))
+            i += 1
+        sent += per_tick
+        depths.append(queue.qsize())
+        await asyncio.sleep(tick)
+    produced = time.perf_counter() - started
+    await _drained(tabs, queue)
+    return {
+        "rate": rate,
+        "lines": sent,
+        "achieved_rate": round(sent / produced),
+        "drain_after_s": round(time.perf_counter() - started - produced, 3),
+        "queue_depth": {"max": max(depths, default=0), **{k: v for k, v in percentiles(depths).items() if k in ("p50", "p95")}},
+    }
+
+
+class _StubPage:
+    """Just enough of ft.Page for Control.update() to go through."""
+
+    def update(self, *controls):
+        pass
+
+
+async def _run(burst: int, rate: int, seconds: float) -> dict:
+    from app.components.agent_tabs import AgentTabs
+
+    queue = asyncio.Queue()
+    tabs = AgentTabs(None, queue, asyncio.Queue())
+    # As if the Logs tab were open, so _render_logs doesn't return early
+    page = _StubPage()
+    tabs.logs_view.page = tabs.logs.page = tabs.log_status.page = page
+    await asyncio.sleep(0.1)  # let the agenda/budget start-up tasks settle
+    return {"burst": await _burst(tabs, queue, burst), "steady": await _steady(tabs, queue, rate, seconds)}
+
+
+def run(burst=100_000, rate=5000, seconds=3.0) -> dict:
+    ensure_mock()
+    result = asyncio.run(_run(burst, rate, seconds))
+    from app.components import agent_tabs
+    result["config"] = {
+        "frame_interval": agent_tabs.LOG_FRAME_INTERVAL,
+        "max_batch": agent_tabs.LOG_MAX_BATCH,
+        "retain": agent_tabs.LOG_RETAIN,
+        "visible": agent_tabs.LOG_VISIBLE,
+        "logs_tab": "attached (stub page)",
+    }
+    result["summary"] = {
+        "logs_burst_lines_per_s": result["burst"]["lines_per_s"],
+        "logs_steady_drain_s": result["steady"]["drain_after_s"],
+        "logs_steady_max_queue": result["steady"]["queue_depth"]["max"],
+    }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AgentTabs log consumer throughput")
+    parser.add_argument("--burst", type=int, default=100_000, help="lines queued at once")
+    parser.add_argument("--rate", type=int, default=5000, help="lines/s for the steady run")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    write_result(args.out, run(args.burst, args.rate, args.seconds))
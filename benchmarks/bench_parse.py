@@ -0,0 +1,112 @@
+# benchmarks/bench_parse.py
+# /parse latency under concurrent load: the task_agent app in its own uvicorn
+# process (talking to the mock Gemini server), driven by an httpx client at
+# a few concurrency levels.
+#
+#   python -m benchmarks.bench_parse [--levels 1,8,32] [--requests 200] [--out result.json]
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import ensure_mock, percentiles, write_result
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.agents.task_agent:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ), stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("task_agent server exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("task_agent server didn't start within 30s")
+
+
+async def _level(client, concurrency: int, requests: int, tag: str, duplicates: bool) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        # Unique texts unless asked otherwise, so the store and in-flight coalescing don't answer
+        text = "Submit the quarterly report" if duplicates else f"Task {tag}-{i}: submit report {i} by Friday"
+        async with sem:
+            started = time.perf_counter()
+            try:
+                r = await client.post("/parse", json={"text": text})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "req_per_s": round(len(latencies) / wall, 2),
+        "latency": percentiles(latencies),
+    }
+
+
+async def _drive(base: str, levels, requests: int, duplicates: bool) -> list:
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base, timeout=120, limits=limits) as client:
+        await client.post("/parse", json={"text": "warm-up"})
+        return [await _level(client, c, requests, f"c{c}", duplicates) for c in levels]
+
+
+def run(levels=(1, 8, 32), requests=200, duplicates=False) -> dict:
+    ensure_mock()
+    port = _free_port()
+    server = start_server(port)
+    try:
+        results = asyncio.run(_drive(f"http://127.0.0.1:{port}", levels, requests, duplicates))
+    finally:
+        server.terminate()
+        server.wait(10)
+    top = results[-1]
+    return {
+        "levels": results,
+        "duplicates": duplicates,
+        "summary": {
+            "parse_p50_s": results[0]["latency"].get("p50"),
+            f"parse_c{top['concurrency']}_p95_s": top["latency"].get("p95"),
+            f"parse_c{top['concurrency']}_req_per_s": top["req_per_s"],
+            "parse_errors": sum(level["errors"] for level in results),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/parse latency under load against the mock Gemini server")
+    parser.add_argument("--levels", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per level")
+    parser.add_argument("--duplicates", action="store_true", help="send the same text every time")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.levels.split(",") if n.strip()]
+    write_result(args.out, run(levels, args.requests, args.duplicates))
@@ -0,0 +1,55 @@
+# benchmarks/common.py
+import json
+import os
+import tempfile
+
+
+def percentiles(values) -> dict:
+    """count / mean / p50 / p95 / p99 / max of `values` (seconds), rounded to 0.1 ms."""
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def at(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(at(0.50), 4),
+        "p95": round(at(0.95), 4),
+        "p99": round(at(0.99), 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def ensure_mock(**options) -> str:
+    """
+    GEMINI_API_BASE for this process. When a bench runs on its own (not from
+    benchmarks.run) and nothing is set, start a mock server in-process.
+    Call before importing app modules: they read their config at import.
+    """
+    base = os.environ.get("GEMINI_API_BASE")
+    if not base:
+        from benchmarks.mock_gemini import serve
+        server = serve(**options)
+        base = os.environ["GEMINI_API_BASE"] = "http://%s:%d" % server.server_address[:2]
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ.setdefault("GOOGLE_API_KEY", os.environ["GEMINI_API_KEY"])
+    # Measure our code, not the free-tier quota
+    os.environ.setdefault("GEMINI_RPM", "100000")
+    os.environ.setdefault("GEMINI_TPM", "1000000000")
+    # Fresh cache and store unless the caller picked them
+    if "GEMINIDESK_CACHE_DIR" not in os.environ:
+        scratch = tempfile.mkdtemp(prefix="geminidesk-bench-")
+        os.environ["GEMINIDESK_CACHE_DIR"] = scratch
+        os.environ.setdefault("GEMINIDESK_STORE", os.path.join(scratch, "documents.sqlite3"))
+    return base
+
+
+def write_result(path: str, result: dict):
+    if path:
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,83 @@
+# benchmarks/corpus.py
+# Synthetic documents for the ingest benchmark: plain text, camera-sized JPEGs
+# and multi-page PDFs with a text layer. The same seed gives the same bytes.
+import os
+import random
+import shutil
+
+_WORDS = ("meeting deadline invoice total receipt lecture chapter summary project "
+          "budget schedule review agenda figure table equation coffee taxi hotel").split()
+
+
+def _paragraphs(rng: random.Random, words: int) -> str:
+    out = []
+    for _ in range(max(1, words // 60)):
+        out.append(" ".join(rng.choice(_WORDS) for _ in range(60)).capitalize() + ".")
+    return "\n\n".join(out)
+
+
+def _pdf(pages) -> bytes:
+    """Smallest valid PDF with one Helvetica text line per page (no reportlab needed)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = [text[i:i + 90] for i in range(0, len(text), 90)][:60]
+        ops = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(
+            "(" + line.replace("\\", "").replace("(", "").replace(")", "") + ") '" for line in lines
+        ) + " ET"
+        stream = ops.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _image(rng: random.Random, path: str, size=(3024, 4032)):
+    """A phone-photo-sized JPEG: a page of text lines on a darker background."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", size, (60, 55, 50))
+    draw = ImageDraw.Draw(img)
+    w, h = size
+    draw.rectangle((w // 10, h // 12, w - w // 10, h - h // 12), fill=(235, 232, 225))
+    for y in range(h // 12 + 80, h - h // 12 - 80, 60):
+        draw.text((w // 10 + 60, y), _paragraphs(rng, 60)[:80], fill=(20, 20, 20))
+    img.save(path, "JPEG", quality=90)
+
+
+def build(root: str, texts=20, images=5, pdfs=5, pdf_pages=8, seed=1) -> dict:
+    """Write the corpus under root; returns {"text": [...], "image": [...], "pdf": [...]} paths."""
+    rng = random.Random(seed)
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+    files = {"text": [], "image": [], "pdf": []}
+    for i in range(texts):
+        path = os.path.join(root, f"note_{i:03d}.txt")
+        with open(path, "w") as f:
+            f.write(_paragraphs(rng, rng.randint(100, 600)))
+        files["text"].append(path)
+    for i in range(images):
+        path = os.path.join(root, f"photo_{i:03d}.jpg")
+        _image(rng, path)
+        files["image"].append(path)
+    for i in range(pdfs):
+        path = os.path.join(root, f"doc_{i:03d}.pdf")
+        with open(path, "wb") as f:
+            f.write(_pdf([_paragraphs(rng, 300) for _ in range(pdf_pages)]))
+        files["pdf"].append(path)
+    return files
@@ -0,0 +1,249 @@
+# benchmarks/mock_gemini.py
+# Local stand-in for the Gemini generateContent endpoints, so benchmarks run
+# offline and repeatably. Point the app at it with GEMINI_API_BASE=http://host:port.
+#
+#   python -m benchmarks.mock_gemini --port 8765 --latency 0.3 --jitter 0.1 --rate-429 0.02
+#
+# Replies are shaped like the real API: JSON that fits the request's
+# responseSchema when there is one, router-style JSON for other JSON-mode
+# calls, and Markdown-ish text otherwise. GET /stats returns request counts.
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_ROUTE = re.compile(r"^/v1(?:beta|alpha)?/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)$")
+_AGENTS = ["NoteAgent", "FinanceAgent", "TaskAgent", "EventAgent"]
+_CATEGORIES = ["Meals", "Travel", "Groceries", "Misc"]
+# Schema "type" as sent with enum-encoding=int (the old SDK's REST transport)
+_TYPE_NUMBERS = {1: "string", 2: "number", 3: "integer", 4: "boolean", 5: "array", 6: "object"}
+_WORDS = ("invoice total meeting agenda deadline project notes summary receipt "
+          "review budget schedule lecture chapter figure equation table").split()
+
+
+def _prompt_text(body: dict) -> str:
+    return "\n".join(
+        part.get("text", "")
+        for content in body.get("contents") or []
+        for part in (content.get("parts") or [])
+        if isinstance(part, dict)
+    )
+
+
+def _pick(seed: str, options):
+    return options[int(hashlib.sha1(seed.encode()).hexdigest(), 16) % len(options)]
+
+
+def sample(schema: dict, seed: str = "", key: str = ""):
+    """A small value that satisfies `schema` ("type" in either casing, or as an enum number)."""
+    kind = schema.get("type", "object")
+    kind = _TYPE_NUMBERS.get(kind, "object") if isinstance(kind, int) else str(kind).lower()
+    if schema.get("enum"):
+        return _pick(seed + key, schema["enum"])
+    if kind == "object":
+        return {name: sample(sub, seed, name) for name, sub in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        return [sample(schema.get("items") or {"type": "string"}, seed + str(i), key) for i in range(2)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return round(5 + int(hashlib.sha1((seed + key).encode()).hexdigest(), 16) % 10000 / 100, 2)
+    if kind == "boolean":
+        return False
+    if "date" in key or key in ("start", "end"):
+        return date.today().isoformat()
+    if key == "time_start":
+        return "09:00"
+    if key == "category":
+        return _pick(seed, _CATEGORIES)
+    return f"mock {key or 'value'}"
+
+
+class MockState:
+    def __init__(self, latency=0.2, jitter=0.05, rate_429=0.0, error_rate=0.0,
+                 stream_chunks=4, chunk_delay=0.02, text_words=120, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.stream_chunks = stream_chunks
+        self.chunk_delay = chunk_delay
+        self.text_words = text_words
+        self.random = random.Random(seed)
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def reply_text(self, body: dict) -> str:
+        prompt = _prompt_text(body)
+        config = body.get("generationConfig") or body.get("generation_config") or {}
+        schema = config.get("responseSchema") or config.get("response_schema")
+        mime = config.get("responseMimeType") or config.get("response_mime_type")
+        if schema:
+            reply = sample(schema, prompt)
+            if isinstance(reply, dict) and "agent" in reply:
+                # Combined route+extract: only the chosen agent's field, like the real model
+                fields = {"TaskAgent": "task", "EventAgent": "event", "FinanceAgent": "receipt", "NoteAgent": "note"}
+                keep = fields.get(reply["agent"])
+                reply = {k: v for k, v in reply.items() if k not in fields.values() or k == keep}
+                reply["confidence"] = 0.9
+            return json.dumps(reply)
+        if mime == "application/json":
+            return json.dumps({"agent": _pick(prompt, _AGENTS), "confidence": 0.9, "content": "mock"})
+        words = [_pick(prompt + str(i), _WORDS) for i in range(self.text_words)]
+        return "# Mock page\n\n" + " ".join(words)
+
+
+def _response(text: str, prompt_tokens: int, final=True) -> dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if final:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": max(1, len(text) // 4),
+            "totalTokenCount": prompt_tokens + max(1, len(text) // 4),
+        },
+        "modelVersion": "mock",
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pools behave as they do upstream
+    state: MockState = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, reason: str, message: str, headers=None):
+        self.state.count(str(status))
+        self._send_json(status, {"error": {"code": status, "message": message, "status": reason}}, headers)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            with self.state.lock:
+                counts = dict(self.state.counts)
+            self._send_json(200, counts)
+        else:
+            self._error(404, "NOT_FOUND", "unknown path")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        match = _ROUTE.match(url.path)
+        if not match:
+            return self._error(404, "NOT_FOUND", f"unknown path {url.path}")
+        try:
+            body = json.loads(body or b"{}")
+        except ValueError:
+            return self._error(400, "INVALID_ARGUMENT", "body is not JSON")
+
+        state = self.state
+        time.sleep(state.delay())
+        roll = state.roll()
+        if roll < state.rate_429:
+            return self._error(429, "RESOURCE_EXHAUSTED", "mock quota exceeded", {"Retry-After": "1"})
+        if roll < state.rate_429 + state.error_rate:
+            return self._error(503, "UNAVAILABLE", "mock upstream error")
+
+        text = state.reply_text(body)
+        prompt_tokens = max(1, len(_prompt_text(body)) // 4)
+        if match.group("method") == "generateContent":
+            state.count("generateContent")
+            return self._send_json(200, _response(text, prompt_tokens))
+
+        state.count("streamGenerateContent")
+        sse = parse_qs(url.query).get("alt", [""])[0] == "sse"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        n = max(1, state.stream_chunks)
+        step = -(-len(text) // n)
+        pieces = [text[i:i + step] for i in range(0, len(text), step)] or [""]
+        for i, piece in enumerate(pieces):
+            chunk = _response(piece, prompt_tokens, final=i == len(pieces) - 1)
+            if sse:
+                frame = f"data: {json.dumps(chunk)}\r\n\r\n"
+            else:
+                # Without alt=sse the API streams one JSON array
+                frame = ("[" if i == 0 else ",\r\n") + json.dumps(chunk) + ("]" if i == len(pieces) - 1 else "")
+            data = frame.encode()
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+            if i < len(pieces) - 1:
+                time.sleep(state.chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def serve(host="127.0.0.1", port=0, **options) -> ThreadingHTTPServer:
+    """Start the mock server on a background thread; returns it (server.server_address has the port)."""
+    handler = type("BoundHandler", (Handler,), {"state": MockState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.05, help="+/- seconds around --latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of calls answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered 503")
+    parser.add_argument("--stream-chunks", type=int, default=4)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--text-words", type=int, default=120, help="words per plain-text (OCR) reply")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def options_from(args) -> dict:
+    return {
+        "latency": args.latency, "jitter": args.jitter, "rate_429": args.rate_429,
+        "error_rate": args.error_rate, "stream_chunks": args.stream_chunks,
+        "chunk_delay": args.chunk_delay, "text_words": args.text_words, "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Gemini generateContent server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, **options_from(args))
+    host, port = server.server_address[:2]
+    # First line is machine-readable so a parent process can pick up the port
+    print(f"http://{host}:{port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
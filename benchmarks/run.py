@@ -0,0 +1,142 @@
+# benchmarks/run.py
+# Run the offline benchmark suite against a mock Gemini server and write one
+# JSON document, so runs can be diffed:
+#
+#   python -m benchmarks.run --out bench/before.json
+#   python -m benchmarks.run --out bench/after.json --compare bench/before.json
+#
+# Each bench runs in a fresh interpreter with its own scratch cache/store;
+# the mock server runs in its own process so it doesn't share our GIL.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_gemini import add_arguments, options_from
+
+BENCHES = {
+    "ingest": "benchmarks.bench_ingest",
+    "parse": "benchmarks.bench_parse",
+    "logs": "benchmarks.bench_logs",
+}
+
+
+def start_mock(args) -> tuple:
+    cmd = [sys.executable, "-m", "benchmarks.mock_gemini", "--port", "0"]
+    for name, value in options_from(args).items():
+        if value is not None:
+            cmd += [f"--{name.replace('_', '-')}", str(value)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    base = proc.stdout.readline().strip()
+    if not base.startswith("http"):
+        proc.kill()
+        raise RuntimeError("mock Gemini server didn't start")
+    return proc, base
+
+
+def run_bench(module: str, base: str, extra) -> dict:
+    scratch = tempfile.mkdtemp(prefix="geminidesk-bench-")
+    out = os.path.join(scratch, "result.json")
+    env = dict(
+        os.environ,
+        GEMINI_API_BASE=base,
+        GEMINIDESK_CACHE_DIR=scratch,
+        GEMINIDESK_STORE=os.path.join(scratch, "documents.sqlite3"),
+    )
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-m", module, "--out", out, *extra],
+                          env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["failed"]
+        return {"error": tail[0], "seconds": round(time.perf_counter() - started, 1)}
+    with open(out) as f:
+        result = json.load(f)
+    result["seconds"] = round(time.perf_counter() - started, 1)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """(metric, before, after, change %) for every summary number in both runs."""
+    rows = []
+    for bench, result in current["results"].items():
+        before = (baseline.get("results", {}).get(bench) or {}).get("summary", {})
+        for metric, value in (result.get("summary") or {}).items():
+            old = before.get(metric)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)):
+                change = (value - old) / old * 100 if old else None
+                rows.append((metric, old, value, change))
+    return rows
+
+
+def _better(metric: str, change: float) -> bool:
+    # Throughputs should go up; latencies, errors and backlogs down
+    return change > 0 if metric.endswith("_per_s") else change < 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline GeminiDesk benchmark suite")
+    parser.add_argument("--only", default=",".join(BENCHES), help="comma-separated: " + ", ".join(BENCHES))
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="earlier results JSON to diff the summary numbers against")
+    parser.add_argument("--quick", action="store_true", help="small corpus and request counts, for a smoke run")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    extras = {
+        "ingest": ["--texts", "10", "--images", "2", "--pdfs", "2"] if args.quick else [],
+        "parse": ["--levels", "1,8", "--requests", "40"] if args.quick else [],
+        "logs": ["--burst", "20000", "--seconds", "1"] if args.quick else [],
+    }
+    # Measure our code, not the free-tier quota
+    os.environ.setdefault("GEMINI_RPM", "100000")
+    os.environ.setdefault("GEMINI_TPM", "1000000000")
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ.setdefault("GOOGLE_API_KEY", os.environ["GEMINI_API_KEY"])
+
+    mock, base = start_mock(args)
+    report = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "mock": options_from(args),
+        "env": {name: os.environ[name] for name in ("GEMINI_RPM", "GEMINI_TPM")},
+        "results": {},
+    }
+    try:
+        for name in [n.strip() for n in args.only.split(",") if n.strip()]:
+            print(f"[Bench] {name} ...", file=sys.stderr, flush=True)
+            report["results"][name] = run_bench(BENCHES[name], base, extras.get(name, []))
+            summary = report["results"][name].get("summary") or report["results"][name]
+            print(f"[Bench] {name}: {json.dumps(summary)}", file=sys.stderr, flush=True)
+    finally:
+        mock.terminate()
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs {args.compare} ({baseline.get('commit')}):", file=sys.stderr)
+        for metric, old, new, change in compare(report, baseline):
+            mark = "" if change is None or abs(change) < 5 else ("  better" if _better(metric, change) else "  WORSE")
+            pct = "n/a" if change is None else f"{change:+.1f}%"
+            print(f"  {metric:32} {old:>12} -> {new:<12} {pct}{mark}", file=sys.stderr)
@@ -0,0 +1,132 @@
+# tests/fake_calendar.py
+# Just enough of the Calendar v3 events API (list with sync/page tokens,
+# insert, patch, and /batch) for CalendarSync to run against offline.
+import json
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_EVENTS = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$")
+
+
+class FakeCalendar:
+    """One calendar's events; each change bumps a version, and a sync token is the version it was issued at."""
+
+    def __init__(self):
+        self.events = {}
+        self.changed = {}  # event id -> version of its last change
+        self.version = 0
+        self.expired = set()  # sync tokens to answer with 410
+        self.page_size = 2500  # most items per list page, whatever maxResults asks for
+        self.requests = []  # (method, path) of every HTTP request, batch parts not included
+        self._lock = threading.Lock()
+
+    def _touch(self, event_id):
+        self.version += 1
+        self.changed[event_id] = self.version
+
+    def add(self, body: dict) -> dict:
+        with self._lock:
+            event = dict(body, id=uuid.uuid4().hex, status="confirmed")
+            self.events[event["id"]] = event
+            self._touch(event["id"])
+            return event
+
+    def handle(self, method: str, path: str, query: dict, body: dict):
+        match = _EVENTS.match(path)
+        if match is None:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        event_id = match.group(2)
+        if method == "GET":
+            token = query.get("syncToken", [None])[0]
+            if token in self.expired:
+                return 410, {"error": {"code": 410, "message": "Sync token is no longer valid"}}
+            start = int(query.get("pageToken", ["0"])[0])
+            size = min(int(query.get("maxResults", ["250"])[0]), self.page_size)
+            since = int(token) if token else -1
+            with self._lock:
+                ids = [i for i, v in sorted(self.changed.items(), key=lambda kv: kv[1]) if v > since]
+                response = {"items": [self.events[i] for i in ids[start:start + size]]}
+                if start + size < len(ids):
+                    response["nextPageToken"] = str(start + size)
+                else:
+                    response["nextSyncToken"] = str(self.version)
+            return 200, response
+        if method == "POST":
+            with self._lock:
+                if any(e.get("iCalUID") == body.get("iCalUID") for e in self.events.values()):
+                    return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+            return 200, self.add(body)
+        if method == "PATCH":
+            with self._lock:
+                if event_id not in self.events:
+                    return 404, {"error": {"code": 404, "message": "Not Found"}}
+                self.events[event_id].update(body)
+                self._touch(event_id)
+                return 200, self.events[event_id]
+        return 405, {"error": {"code": 405, "message": "Method not allowed"}}
+
+    def _batch(self, raw: bytes, content_type: str) -> tuple:
+        boundary = content_type.split("boundary=")[1].strip('"')
+        out_boundary = "batch_" + uuid.uuid4().hex
+        out = []
+        for part in raw.decode("utf-8").split("--" + boundary):
+            part = part.strip()
+            if not part or part == "--":
+                continue
+            headers, _, inner = part.replace("\r\n", "\n").partition("\n\n")
+            content_id = re.search(r"Content-ID: <([^>]+)>", headers, re.I).group(1)
+            request_line, _, rest = inner.partition("\n")
+            method, url, _ = request_line.split(" ")
+            _, _, body = rest.partition("\n\n")
+            parsed = urlparse(url)
+            status, response = self.handle(method, parsed.path, parse_qs(parsed.query),
+                                           json.loads(body) if body.strip() else {})
+            data = json.dumps(response)
+            out.append(
+                f"--{out_boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n{data}\r\n"
+            )
+        return ("".join(out) + f"--{out_boundary}--\r\n").encode("utf-8"), f"multipart/mixed; boundary={out_boundary}"
+
+    def serve(self) -> ThreadingHTTPServer:
+        """Start serving on a free localhost port in a daemon thread."""
+        calendar = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, data: bytes, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _dispatch(self, method):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                calendar.requests.append((method, url.path))
+                if url.path == "/batch/calendar/v3":
+                    data, content_type = calendar._batch(raw, self.headers["Content-Type"])
+                    return self._reply(200, data, content_type)
+                status, response = calendar.handle(method, url.path, parse_qs(url.query),
+                                                   json.loads(raw) if raw else {})
+                self._reply(status, json.dumps(response).encode("utf-8"))
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,137 @@
+# tests/test_calendar_sync.py
+# CalendarSync end to end against tests/fake_calendar.py (no Google account needed).
+import re
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from app.agents import calendar_sync  # noqa: E402
+from app.agents.calendar_sync import CalendarSync, EventCache, to_calendar_event  # noqa: E402
+from fake_calendar import FakeCalendar  # noqa: E402
+
+
+@pytest.fixture
+def fake(monkeypatch, tmp_path):
+    calendar = FakeCalendar()
+    server = calendar.serve()
+    monkeypatch.setattr(calendar_sync, "CALENDAR_API_ENDPOINT", f"http://127.0.0.1:{server.server_port}/")
+    monkeypatch.setattr(calendar_sync, "TOKEN_PATH", str(tmp_path / "no-token.json"))
+    monkeypatch.setattr(calendar_sync, "_creds", None)
+    monkeypatch.setattr(calendar_sync, "_service", None)
+    yield calendar
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sync(fake):
+    return CalendarSync("primary", cache=EventCache(":memory:"), batch_size=50)
+
+
+def _lectures(n):
+    return [{"title": f"Lecture {i}", "start": f"2026-11-{i % 28 + 1:02d}T10:00:00",
+             "end": f"2026-11-{i % 28 + 1:02d}T11:00:00"} for i in range(n)]
+
+
+def test_pull_is_full_then_incremental(fake, sync):
+    for i in range(30):
+        fake.add({"summary": f"existing {i}", "iCalUID": f"existing-{i}"})
+
+    first = sync.pull()
+    assert first == {"requests": 1, "changed": 30, "full": True, "cached": 30}
+
+    fake.requests.clear()
+    again = sync.pull()
+    assert again == {"requests": 1, "changed": 0, "full": False, "cached": 30}
+    # Resumed from the sync token rather than listing everything
+    assert len(fake.requests) == 1
+
+    fake.add({"summary": "new", "iCalUID": "new"})
+    assert sync.pull()["changed"] == 1
+
+
+def test_pull_pages_through_a_full_listing(fake, sync):
+    fake.page_size = 2
+    for i in range(5):
+        fake.add({"summary": f"e{i}", "iCalUID": f"e{i}"})
+    result = sync.pull()
+    assert result == {"requests": 3, "changed": 5, "full": True, "cached": 5}
+
+
+def test_expired_sync_token_falls_back_to_a_full_resync(fake, sync):
+    fake.add({"summary": "kept", "iCalUID": "kept"})
+    sync.pull()
+    fake.expired.add(sync.cache.sync_token("primary"))
+
+    fake.requests.clear()
+    result = sync.pull()
+    assert result["full"] is True
+    assert result["cached"] == 1
+    # The 410, then the full listing
+    assert len(fake.requests) == 2
+
+
+def test_plan_and_push_only_send_what_changed(fake, sync):
+    items = _lectures(60) + [
+        {"title": "Gym", "start": "2026-11-02T07:00", "recurring": {"frequency": "weekly", "interval": 2}},
+        {"title": "no date"},
+    ]
+    sync.pull()
+    inserts, patches, skipped = sync.plan(items)
+    assert (len(inserts), len(patches), skipped) == (61, 0, 1)
+
+    fake.requests.clear()
+    first = sync.push(items)
+    assert first["inserted"] == 61 and first["errors"] == 0
+    assert first["batches"] == 2
+    assert all(path == "/batch/calendar/v3" for _, path in fake.requests)
+
+    assert sync.plan(items) == ([], [], 62)
+    items[0]["location"] = "Room 5"
+    second = sync.push(items)
+    assert (second["inserted"], second["updated"], second["skipped"]) == (0, 1, 61)
+    patched = [e for e in fake.events.values() if e["summary"] == "Lecture 0"]
+    assert patched[0]["location"] == "Room 5"
+
+
+def test_push_skips_conflicts_and_reports_errors(fake, sync, monkeypatch):
+    item = _lectures(1)[0]
+    # Already on the calendar, but our cache doesn't know: insert gets a 409 and is left alone
+    fake.add(to_calendar_event(item))
+    assert sync.push([item])["errors"] == 0
+
+    original = fake.handle
+    monkeypatch.setattr(fake, "handle", lambda method, path, query, body: (
+        (403, {"error": {"code": 403, "message": "Insufficient Permission"}}) if method == "POST"
+        else original(method, path, query, body)))
+    result = sync.push(_lectures(3)[1:])
+    assert result["errors"] == 2
+    assert all("Insufficient Permission" in message for message in result["error_messages"])
+
+
+def test_recurring_times_use_the_calendar_zone(monkeypatch):
+    monkeypatch.setattr(calendar_sync, "CALENDAR_TIMEZONE", "America/New_York")
+    body = to_calendar_event({"title": "Standup", "start": "2026-03-02T09:00",
+                              "recurring": {"frequency": "daily", "end_date": "2026-03-20"}})
+    moment = datetime(2026, 3, 2, 9, 0).astimezone()
+    assert body["start"]["timeZone"] == "America/New_York"
+    assert datetime.fromisoformat(body["start"]["dateTime"]) == moment
+    assert body["start"]["dateTime"].endswith("-05:00")
+
+    monkeypatch.setattr(calendar_sync, "CALENDAR_TIMEZONE", "")
+    body = to_calendar_event({"title": "Standup", "start": "2026-03-02T09:00", "recurring": {"frequency": "daily"}})
+    assert body["start"]["timeZone"] == "UTC"
+    assert body["start"]["dateTime"].endswith("+00:00")
+
+
+def test_all_day_until_is_a_date():
+    body = to_calendar_event({"title": "Bins", "start": "2026-03-02",
+                              "recurring": {"frequency": "weekly", "end_date": "2026-04-27"}})
+    assert body["start"] == {"date": "2026-03-02"}
+    assert body["recurrence"] == ["RRULE:FREQ=WEEKLY;UNTIL=20260427"]
+
+    timed = to_calendar_event({"title": "Bins", "start": "2026-03-02T07:00",
+                               "recurring": {"frequency": "weekly", "end_date": "2026-04-27"}})
+    assert re.fullmatch(r"RRULE:FREQ=WEEKLY;UNTIL=\d{8}T\d{6}Z", timed["recurrence"][0])
@@ -0,0 +1,82 @@
+# tests/test_recurrence.py
+import time as _time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.agents import recurrence
+from app.agents.recurrence import RecurrenceIndex, index_items, parse_when
+from app.utils.store import DocumentStore
+
+
+@pytest.fixture
+def berlin(monkeypatch):
+    """Run as if the machine's local zone were Europe/Berlin (UTC+1 in March, +2 in July)."""
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    _time.tzset()
+    yield
+    monkeypatch.undo()
+    _time.tzset()
+
+
+def test_parse_when_converts_offsets_to_local_time(berlin):
+    assert parse_when("2025-03-01T09:00Z") == datetime(2025, 3, 1, 10, 0)
+    assert parse_when("2025-03-01T09:00:00+00:00") == datetime(2025, 3, 1, 10, 0)
+    assert parse_when("2025-03-01T09:00+02:00") == datetime(2025, 3, 1, 8, 0)
+    assert parse_when("2025-07-01T09:00+02:00") == datetime(2025, 7, 1, 9, 0)
+    # No offset: already local wall-clock time
+    assert parse_when("2025-03-01T09:00") == datetime(2025, 3, 1, 9, 0)
+    assert parse_when("2025-03-01", "9:30 AM") == datetime(2025, 3, 1, 9, 30)
+
+
+def test_offset_times_land_in_the_right_window(berlin):
+    index = RecurrenceIndex()
+    index_items(index, 1, [
+        {"title": "utc", "start": "2025-03-01T23:30Z"},  # 00:30 on March 2nd in Berlin
+        {"title": "cest", "start": "2025-03-02T01:00+02:00"},  # 00:00 on March 2nd in Berlin
+    ])
+    day = index.between(datetime(2025, 3, 2), datetime(2025, 3, 3))
+    assert [(o["item"]["title"], o["start"]) for o in day] == [
+        ("cest", datetime(2025, 3, 2, 0, 0)),
+        ("utc", datetime(2025, 3, 2, 0, 30)),
+    ]
+    assert index.between(datetime(2025, 3, 1), datetime(2025, 3, 2)) == []
+
+
+def test_reindexing_a_document_replaces_its_rules():
+    index = RecurrenceIndex(block_size=2)
+    index_items(index, 7, [
+        {"title": "gym", "start": "2025-03-03T07:00", "recurring": {"frequency": "weekly"}},
+        {"title": "dentist", "start": "2025-03-05T10:00"},
+    ])
+    index_items(index, 8, [{"title": "other", "start": "2025-03-04T12:00"}])
+    index_items(index, 7, [
+        {"title": "gym", "start": "2025-03-03T07:00", "recurring": {"frequency": "weekly", "end_date": "2025-03-10"}},
+    ])
+
+    assert len(index) == 2
+    titles = [o["item"]["title"] for o in index.between(datetime(2025, 3, 1), datetime(2025, 4, 1))]
+    assert titles == ["gym", "other", "gym"]
+    # The forever rule is gone, so no block still claims to run into the far future
+    assert index.candidates(datetime(2026, 1, 1), datetime(2026, 2, 1)) == []
+
+    index.remove_document(7)
+    assert [key for key, _ in index.candidates(datetime(2025, 3, 1), datetime(2025, 4, 1))] == ["8:0"]
+
+
+def test_store_replace_drops_old_rules(monkeypatch):
+    store = DocumentStore(":memory:")
+    monkeypatch.setattr("app.utils.store._store", store)
+    monkeypatch.setattr(recurrence, "_index", None)
+    event = {"title": "standup", "start": "2025-03-03T09:00", "recurring": {"frequency": "daily"}}
+    store.add_document("a.txt", "standup", digest="abc", route={"agent": "EventAgent"}, parsed=event)
+
+    index = recurrence.get_index()
+    assert len(index) == 1
+
+    moved = dict(event, start="2025-03-03T10:00")
+    doc_id = store.add_document("a.txt", "standup", digest="abc", route={"agent": "EventAgent"}, parsed=moved)
+    recurrence.index_document(doc_id, [moved])
+
+    day = index.between(datetime(2025, 3, 4), datetime(2025, 3, 4) + timedelta(days=1))
+    assert [(o["key"], o["start"].hour) for o in day] == [(f"{doc_id}:0", 10)]